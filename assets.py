@@ -0,0 +1,105 @@
+"""Versioned static assets: stylesheets, the activity script and the header logo.
+
+The files live in static/ and are served by Streamlit's static file server
+(server.enableStaticServing in .streamlit/config.toml), so a rerun only sends a
+one-line <link> and the browser keeps the stylesheet — fonts @import and all —
+in its cache. Each URL carries a content hash, so an edited file is picked up
+on the next page load instead of a stale cached copy. With static serving off
+the same files are inlined, as the app used to do.
+
+Contents and hashes are read once per process, not once per rerun.
+
+The logo source is a 4000 px PNG shown 70 px wide. `python -m assets` builds
+static/logo.png at twice the display width (sharp on high-DPI phones), as a
+256-colour palette PNG with alpha; rerun it after replacing the source logo.
+The header shows it as an <img width="70"> (logo_html), so the browser does the
+downscaling and Streamlit never re-encodes it.
+
+    python -m assets            # rebuild static/logo.png
+"""
+import base64
+import hashlib
+import io
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+STATIC_DIR = Path(__file__).parent / "static"
+STATIC_URL = "app/static"
+
+@lru_cache(maxsize=None)
+def read_asset(name):
+    """(text, version) for a file in static/; version is a short content hash."""
+    text = (STATIC_DIR / name).read_text(encoding="utf-8")
+    return text, hashlib.sha1(text.encode()).hexdigest()[:10]
+
+def asset_url(name):
+    return f"{STATIC_URL}/{name}?v={read_asset(name)[1]}"
+
+@lru_cache(maxsize=None)
+def stylesheet_html(name, static_serving=True):
+    """Markup that applies static/<name>: a cached <link> when served, else inline <style>."""
+    if static_serving:
+        return f'<link rel="stylesheet" href="{asset_url(name)}">'
+    return f"<style>\n{read_asset(name)[0]}</style>"
+
+@lru_cache(maxsize=None)
+def script_html(name):
+    return f"<script>\n{read_asset(name)[0]}</script>"
+
+# ─── LOGO ───────────────────────────────────────────────────────────
+LOGO_SOURCE = Path(__file__).parent / "Copy_of_AccentRoofing-Logo.png"
+LOGO        = "logo.png"
+LOGO_WIDTH  = 70
+LOGO_SCALE  = 2
+
+def render_logo(source=LOGO_SOURCE, width=LOGO_WIDTH * LOGO_SCALE):
+    """PNG bytes of the source logo resized to width px, palette-quantized with alpha."""
+    from PIL import Image
+    with Image.open(source) as im:
+        im = im.convert("RGBA")
+        im = im.resize((width, round(im.height * width / im.width)), Image.LANCZOS)
+    buf = io.BytesIO()
+    im.quantize(256, method=Image.Quantize.FASTOCTREE).save(buf, "PNG", optimize=True)
+    return buf.getvalue()
+
+def build_logo():
+    """Write static/logo.png from the source logo. Returns (source bytes, built bytes)."""
+    data = render_logo()
+    (STATIC_DIR / LOGO).write_bytes(data)
+    return LOGO_SOURCE.stat().st_size, len(data)
+
+@lru_cache(maxsize=None)
+def logo_bytes():
+    """The header logo as PNG bytes, held for the life of the process.
+
+    Uses the built static/logo.png, or renders one in memory if it is missing;
+    None when there is no logo at all.
+    """
+    built = STATIC_DIR / LOGO
+    if built.exists():
+        return built.read_bytes()
+    if LOGO_SOURCE.exists():
+        return render_logo()
+    return None
+
+@lru_cache(maxsize=None)
+def logo_html(static_serving=True):
+    """<img> showing the logo LOGO_WIDTH px wide: static/logo.png by versioned URL when
+    served, else inlined as a data URI; "" when there is no logo."""
+    built = STATIC_DIR / LOGO
+    if static_serving and built.exists():
+        src = f"{STATIC_URL}/{LOGO}?v={hashlib.sha1(built.read_bytes()).hexdigest()[:10]}"
+    else:
+        data = logo_bytes()
+        if data is None:
+            return ""
+        src = "data:image/png;base64," + base64.b64encode(data).decode()
+    return f'<img src="{src}" width="{LOGO_WIDTH}" alt="Accent Roofing">'
+
+def main():
+    src, out = build_logo()
+    print(f"static/{LOGO}: {LOGO_WIDTH * LOGO_SCALE} px, {out:,} bytes (source {src:,} bytes)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
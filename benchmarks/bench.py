@@ -0,0 +1,248 @@
+"""Micro-benchmarks for the pricing, rendering and handbook search hot paths.
+
+    python -m benchmarks.bench              # run and compare with baseline.json
+    python -m benchmarks.bench --save       # run and overwrite baseline.json
+    python -m benchmarks.bench -k render    # only cases whose name contains "render"
+
+Each case draws a fixed-seed set of realistic inputs, calls the function once
+per input, repeats the sweep a few times and keeps the fastest. Per-call
+latency and throughput are reported next to the saved baseline; any case more
+than --tolerance slower than its baseline fails the run (exit status 1).
+"""
+import argparse
+import atexit
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing import (
+    tier_rate, waste_std, waste_low, cost_large, cost_small_product, price_rows,
+    TIERS, LARGE_GPMS, SMALL_GPMS, SMALL_PRODUCTS, SMALL_HDZ_TIERS,
+)
+from pricing.quote import full_roof_quote, presentation_prices
+from html_render import render_table, render_cpo_presentation, rate_rows, RATE_TABLE
+from handbook import HandbookIndex, query_weights, query_key
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+HANDBOOK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "handbook_chunks.json")
+SEED = 20250601
+
+# ─── INPUT DISTRIBUTIONS ────────────────────────────────────────────
+# Rough shape of a year of quotes: mostly 20-45 SQ HDZ roofs at 6-8/12 with a
+# moderate number of facets, and a long tail of large, cut-up, steep roofs.
+def _sq(r):      return round(r.uniform(20, 45) if r.random() < 0.7 else r.uniform(45, 120), 2)
+def _small_sq(r): return r.randint(1, 19)
+def _facets(r):  return r.choice([r.randint(0, 4), r.randint(5, 6)] + [r.randint(7, 20)] * 5 + [r.randint(21, 35)] * 2 + [r.randint(36, 60)])
+def _pitch(r):   return r.choice([4, 5] + [6, 7, 8] * 3 + [9, 10, 11, 12, 13])
+def _product(r): return r.choice(["HDZ"] * 10 + ["UHDZ"] * 4 + ["CT Landmark"] * 3 + ["OC / RS / Prud"] * 2 + ["CAM II / Slateline"])
+def _gpm(r):     return r.choice([None] * 3 + [round(r.uniform(0.15, 0.45), 2)])
+
+def _roof(r):
+    product = _product(r)
+    return waste_std(_sq(r), _facets(r)), _pitch(r), product, r.choice(TIERS[product])
+
+# Handbook tab: the suggestion buttons and short free-text questions
+HB_SUGGESTIONS = [
+    "T-Bird monthly sales expectations", "Pay commission structure GPM", "5-step sales process flow chart",
+    "Insurance claim appointment steps", "Warranty differences tiers", "No-show SOP procedure",
+    "Full replacement bid calculation", "Repair labor rates",
+]
+HB_WORDS = ("minimum gpm self generated lead commission insurance adjuster claim warranty shingle "
+            "deck repair labor financing appointment overturn checklist bid price customer roof").split()
+
+def _hb_query(r):
+    if r.random() < 0.4:
+        return r.choice(HB_SUGGESTIONS)
+    return " ".join(r.sample(HB_WORDS, r.randint(2, 6)))
+
+# ─── CASES ──────────────────────────────────────────────────────────
+# Each returns (function, list of argument tuples).
+def case_waste_std(r, n):
+    return waste_std, [(_sq(r), _facets(r)) for _ in range(n)]
+
+def case_waste_low(r, n):
+    return waste_low, [(round(r.uniform(0.5, 10), 2), _facets(r), r.choice([1, 2, 3])) for _ in range(n)]
+
+def case_cost_large(r, n):
+    return cost_large, [_roof(r) for _ in range(n)]
+
+def case_cost_small_product(r, n):
+    def args():
+        product = r.choice(SMALL_PRODUCTS)
+        return _small_sq(r), product, r.choice(SMALL_HDZ_TIERS) if product == "HDZ" else None
+    return cost_small_product, [args() for _ in range(n)]
+
+def case_price_rows(r, n):
+    return price_rows, [(cost_large(*_roof(r)), LARGE_GPMS, _gpm(r)) for _ in range(n)]
+
+def case_render_table(r, n):
+    def args():
+        std_tsq, *rest = _roof(r)
+        return price_rows(cost_large(std_tsq, *rest), LARGE_GPMS, _gpm(r)), std_tsq
+    return render_table, [args() for _ in range(n)]
+
+def case_render_table_small(r, n):
+    def args():
+        tsq = _small_sq(r)
+        return price_rows(cost_small_product(tsq, "HDZ", "Gold"), SMALL_GPMS, _gpm(r)), tsq, False
+    return render_table, [args() for _ in range(n)]
+
+def case_render_cpo_presentation(r, n):
+    def args():
+        std_tsq, pitch, product, _ = _roof(r)
+        financing = r.random() < 0.8
+        quote = full_roof_quote(std_tsq, pitch, product, pres_margin=r.choice([0.39, 0.37, 0.35, 0.32]), financing=financing)
+        return r.choice(["—", "Smith", "Johnson Residence"]), product, presentation_prices(quote), financing
+    return render_cpo_presentation, [args() for _ in range(n)]
+
+# Large tables: the table renderer with its memo bypassed, next to the += loop
+# it replaced, on the full per-SQ rate grid and on a per-pitch grid. The two
+# are on par; what the renderer buys is the memo, measured by the _memo case
+# (a rerun redrawing a table it has drawn before).
+def _concat_rate_table(rows):
+    html = ""
+    for prod, tier, r1, r2, r3 in rows:
+        html += f"<tr><td>{prod}</td><td>{tier}</td><td>${r1}</td><td>${r2}</td><td>${r3}</td></tr>"
+    return f'<div class="card"><table class="wtbl"><tbody>{html}</tbody></table></div>'
+
+def _rate_grids(r, n):
+    grid = list(rate_rows())
+    return [(tuple(r.sample(grid, len(grid))),) for _ in range(n)]
+
+def _pitch_grids(r, n):
+    # every product tier at every pitch 0-13, priced for one roof size
+    def grid():
+        tsq = r.randint(20, 60)
+        return tuple((prod, f"{tier} {p}/12", *(tsq * tier_rate(prod, tier, p) for _ in range(3)))
+                     for prod in TIERS for tier in TIERS[prod] for p in range(14))
+    return [(grid(),) for _ in range(max(1, n // 20))]
+
+def case_table_rate_grid(r, n):
+    return RATE_TABLE.__wrapped__, _rate_grids(r, n)
+
+def case_table_rate_grid_concat(r, n):
+    return _concat_rate_table, _rate_grids(r, n)
+
+def case_table_rate_grid_memo(r, n):
+    grids = _rate_grids(r, 8)
+    for g in grids:
+        RATE_TABLE(*g)
+    return RATE_TABLE, [r.choice(grids) for _ in range(n)]
+
+def case_table_pitch_grid(r, n):
+    return RATE_TABLE.__wrapped__, _pitch_grids(r, n)
+
+def case_table_pitch_grid_concat(r, n):
+    return _concat_rate_table, _pitch_grids(r, n)
+
+def case_handbook_load(r, n):
+    """Worker start-up: the index memory-mapped from its prebuilt artifact (few calls, each is ms)."""
+    root = tempfile.mkdtemp(prefix="bench-handbook-")
+    atexit.register(shutil.rmtree, root, True)
+    HandbookIndex.from_file(HANDBOOK, index_dir=root)
+    return HandbookIndex.from_file, [(HANDBOOK, root)] * min(n, 20)
+
+def case_handbook_search(r, n):
+    index = HandbookIndex.from_file(HANDBOOK)
+    return index.search, [(_hb_query(r), 5) for _ in range(n)]
+
+def _hb_keys(r, n, mode):
+    return [(query_key(query_weights(_hb_query(r))), 5, mode) for _ in range(n)]
+
+def case_handbook_rank(r, n):
+    """Ranking alone, bypassing the result cache."""
+    return HandbookIndex.from_file(HANDBOOK)._ranked, _hb_keys(r, n, "bm25")
+
+def case_handbook_rank_semantic(r, n):
+    return HandbookIndex.from_file(HANDBOOK)._ranked, _hb_keys(r, n, "semantic")
+
+def case_handbook_rank_keyword(r, n):
+    return HandbookIndex.from_file(HANDBOOK)._ranked, _hb_keys(r, n, "keyword")
+
+def case_handbook_keystroke(r, n):
+    """One search-as-you-type update, bypassing the result cache."""
+    index = HandbookIndex.from_file(HANDBOOK)
+    index.ranked = index._ranked
+    def typed():
+        q = _hb_query(r)
+        return q[:r.randint(1, len(q))]
+    return index.search_incremental, [(typed(), 5) for _ in range(n)]
+
+CASES = {name[5:]: fn for name, fn in globals().items() if name.startswith("case_")}
+
+# ─── RUNNER ─────────────────────────────────────────────────────────
+def measure(fn, inputs, repeat):
+    """Fastest sweep over inputs, as nanoseconds per call."""
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter_ns()
+        for a in inputs:
+            fn(*a)
+        best = min(best, time.perf_counter_ns() - t0)
+    return best / len(inputs)
+
+def run(names, calls, repeat):
+    results = {}
+    for name in names:
+        fn, inputs = CASES[name](random.Random(f"{SEED}:{name}"), calls)
+        ns = measure(fn, inputs, repeat)
+        results[name] = {"us_per_call": round(ns / 1000, 3), "calls_per_s": round(1e9 / ns)}
+    return results
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f).get("cases", {})
+
+def report(results, baseline, tolerance):
+    """Print the results table; return the names of cases that regressed."""
+    regressed = []
+    print(f"{'case':<28}{'us/call':>10}{'calls/s':>12}{'baseline':>10}{'change':>9}")
+    for name, res in results.items():
+        base = baseline.get(name, {}).get("us_per_call")
+        change = ""
+        if base:
+            delta = res["us_per_call"] / base - 1
+            change = f"{delta:+.0%}"
+            if delta > tolerance:
+                regressed.append(name)
+                change += " !"
+        print(f"{name:<28}{res['us_per_call']:>10.3f}{res['calls_per_s']:>12,}{base or '—':>10}{change:>9}")
+    return regressed
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.bench", description=__doc__.split("\n")[0])
+    ap.add_argument("-k", dest="only", default="", help="only run cases whose name contains this")
+    ap.add_argument("--calls", type=int, default=2000, help="inputs per case (default 2000)")
+    ap.add_argument("--repeat", type=int, default=5, help="sweeps per case, fastest kept (default 5)")
+    ap.add_argument("--tolerance", type=float, default=0.30, help="allowed slowdown vs baseline (default 0.30)")
+    ap.add_argument("--baseline", default=BASELINE, help="baseline JSON file")
+    ap.add_argument("--save", action="store_true", help="write these results as the new baseline")
+    args = ap.parse_args(argv)
+
+    names = [n for n in CASES if args.only in n]
+    results = run(names, args.calls, args.repeat)
+    regressed = report(results, load_baseline(args.baseline), args.tolerance)
+
+    if args.save:
+        saved = load_baseline(args.baseline)
+        saved.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "cases": saved}, f, indent=2)
+            f.write("\n")
+        print(f"baseline saved to {args.baseline}")
+    elif regressed:
+        print(f"regressed beyond {args.tolerance:.0%}: {', '.join(regressed)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+"""Thunderbird handbook search, importable without Streamlit.
+
+handbook.index holds the inverted index the handbook tab searches, built from
+handbook_chunks.json over the normalized fields of handbook.fields;
+handbook.bm25 ranks it, and handbook.semantic adds LSA retrieval for
+paraphrased questions. handbook.artifact saves the built index as arrays that
+every process memory-maps (python -m handbook builds it ahead of time).
+"""
+from handbook.fields import Chunks, Fields, Strings
+from handbook.semantic import LSA
+from handbook.index import (
+    HandbookIndex, query_weights, query_key, query_words,
+    MODES, HEADING_CHARS, FIELD_WEIGHTS, STOP_WORDS, EXPANSIONS, EXPANSION_WEIGHT, RESULT_CACHE_SIZE, PREFIX_MIN,
+)
@@ -0,0 +1,6 @@
+"""python -m handbook: build the handbook index artifact ahead of time (see handbook.artifact)."""
+import sys
+
+from handbook.artifact import main
+
+sys.exit(main())
@@ -0,0 +1,106 @@
+"""The handbook index as a prebuilt, memory-mapped artifact.
+
+Building the index means parsing handbook_chunks.json, lowercasing and
+tokenizing every chunk, then computing postings, BM25 weights and LSA vectors.
+All of that is done once, ahead of time, and saved as plain arrays — the
+chunks' pages, chapters and text, the normalized fields and their tokens, each
+field's postings, the BM25 matrix and the LSA vectors — one .npy file each,
+next to a meta file holding the vocabularies:
+
+    handbook_index/<key>/meta.json   build key, chunk count, vocabularies, array names
+    handbook_index/<key>/*.npy       the arrays
+
+Workers memory-map the arrays instead of rebuilding them, so starting up is
+opening files, and the pages are shared through the OS page cache instead of
+each worker holding its own copy of the chunks and index.
+
+<key> hashes handbook_chunks.json's contents and every build setting, so a
+changed handbook or setting is a new directory: the app rebuilds only then,
+and older directories are removed. A directory is written under a temporary
+name and renamed into place once complete, so a reader sees a whole artifact
+or none. Build it ahead of deploys with:
+
+    python -m handbook [handbook_chunks.json] [--out handbook_index]
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+from handbook.bm25 import K1, BM25F_FIELDS
+from handbook.fields import HEADING_CHARS
+from handbook.semantic import LSA_DIMS, MIN_WORD
+
+# Bump when the arrays' layout or meaning changes
+ARTIFACT_VERSION = 1
+INDEX_DIR = "handbook_index"
+META = "meta.json"
+KEY_CHARS = 16
+
+def source_hash(data):
+    return hashlib.sha1(data).hexdigest()
+
+def build_key(source, stop_words=()):
+    """Identifies an index built from source (source_hash() of the chunks file) with the current settings."""
+    settings = json.dumps([ARTIFACT_VERSION, source, HEADING_CHARS, K1, BM25F_FIELDS, LSA_DIMS, MIN_WORD,
+                           sorted(stop_words)])
+    return hashlib.sha1(settings.encode()).hexdigest()
+
+def save(root, key, arrays, meta):
+    """Write arrays ({name: ndarray}) and meta to root/<key>, replacing older builds; returns the directory."""
+    os.makedirs(root, exist_ok=True)
+    path = os.path.join(root, key[:KEY_CHARS])
+    tmp  = tempfile.mkdtemp(prefix=".build-", dir=root)
+    try:
+        for name, arr in arrays.items():
+            np.save(os.path.join(tmp, name + ".npy"), np.ascontiguousarray(arr))
+        with open(os.path.join(tmp, META), "w") as f:
+            json.dump({**meta, "key": key, "arrays": sorted(arrays)}, f)
+        os.rename(tmp, path)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isdir(path):
+            raise
+        # another process finished the same build first
+    prune(root, keep=os.path.basename(path))
+    return path
+
+def load(root, key):
+    """(arrays, meta) of the build of key under root, arrays memory-mapped read-only; None if missing."""
+    path = os.path.join(root, key[:KEY_CHARS])
+    try:
+        with open(os.path.join(path, META)) as f:
+            meta = json.load(f)
+        if meta["key"] != key:
+            return None
+        # Plain ndarray views of the maps: slicing an np.memmap costs more per call
+        arrays = {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r").view(np.ndarray)
+                  for name in meta["arrays"]}
+    except (OSError, ValueError, KeyError):
+        return None
+    return arrays, meta
+
+def prune(root, keep):
+    """Remove the builds under root other than keep. Processes still mapping one keep their pages."""
+    for name in os.listdir(root):
+        if name != keep and not name.startswith(".") and os.path.isfile(os.path.join(root, name, META)):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+def main(argv=None):
+    from handbook.index import HandbookIndex
+    ap = argparse.ArgumentParser(prog="python -m handbook", description=__doc__.split("\n")[0])
+    ap.add_argument("source", nargs="?", default="handbook_chunks.json")
+    ap.add_argument("--out", default=None, help=f"output directory (default: {INDEX_DIR} beside source)")
+    args = ap.parse_args(argv)
+    out = args.out or os.path.join(os.path.dirname(os.path.abspath(args.source)), INDEX_DIR)
+    with open(args.source, "rb") as f:
+        data = f.read()
+    index = HandbookIndex(json.loads(data))
+    path  = index.save(out, source_hash(data))
+    size  = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    print(f"{path}: {len(index)} chunks, {len(index.vocab):,} terms, {size / 1e3:,.0f} KB", file=sys.stderr)
@@ -0,0 +1,106 @@
+"""BM25 ranking for handbook search.
+
+Terms match whole words ("pay" no longer matches inside "payment"), and a
+chunk's score for a term saturates, so long chunks stop winning on length
+alone. The three index fields are combined BM25F-style: each field's term
+frequency is length-normalized against that field's average, weighted, summed,
+then saturated once with K1.
+
+Everything that does not depend on the query — field lengths, IDF and the
+saturated per-(term, chunk) weights — is computed when the index is built (ahead of
+time, see handbook.artifact) and stored as a CSR matrix (one row per vocabulary term, one column per chunk).
+Scoring a query is then a sparse matrix-vector product: the query's term
+weights times their rows, summed per chunk with np.bincount.
+
+Rows are in sorted vocabulary order, so the terms sharing a prefix are one
+contiguous block of the matrix: a half-typed word is scored from that block
+alone, each chunk taking its best completion.
+"""
+from bisect import bisect_left
+
+import numpy as np
+
+K1 = 1.2
+# field: (weight, b) — b is the strength of length normalization. Chapter names
+# are a few words each, so their length says nothing about relevance.
+BM25F_FIELDS = {"text": (1.0, 0.75), "heading": (2.0, 0.75), "chapter": (1.5, 0.0)}
+
+class BM25:
+    """Precomputed BM25F weights over an index's per-field postings."""
+
+    def __init__(self, vocab, n_docs, indptr, indices, data, term_id=None):
+        """vocab: the sorted terms, one CSR row each over n_docs chunks (see build());
+        term_id: vocab's {term: row} if already built (Fields.term_id)."""
+        self.vocab   = vocab
+        self.term_id = term_id if term_id is not None else {t: i for i, t in enumerate(vocab)}
+        self.n_docs  = n_docs
+        self.indptr  = indptr
+        self.indices = indices
+        self.data    = data
+
+    @classmethod
+    def build(cls, vocab, postings, lengths, term_id=None):
+        """postings: {field: (ptr, chunks, tfs)} CSR over vocab (see Fields.postings);
+        lengths: {field: token count per chunk}."""
+        n_docs = len(lengths["text"])
+        rows, cols, tfs = [], [], []
+        for field, (weight, b) in BM25F_FIELDS.items():
+            lens = np.asarray(lengths[field], dtype=float)
+            avg  = lens.mean() if lens.any() else 1.0
+            norm = 1 - b + b * lens / avg
+            ptr, docs, tf = postings[field]
+            rows.append(np.repeat(np.arange(len(vocab), dtype=np.int64), np.diff(ptr)))
+            cols.append(docs)
+            tfs.append(weight * tf / norm[docs])
+        # Sum each (term, chunk)'s weighted field tfs, rows then chunks ascending
+        n = max(n_docs, 1)
+        pairs, inverse = np.unique(np.concatenate(rows) * n + np.concatenate(cols), return_inverse=True)
+        tf  = np.bincount(inverse.ravel(), weights=np.concatenate(tfs), minlength=len(pairs))
+        row = pairs // n
+        df  = np.bincount(row, minlength=len(vocab))
+        idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        return cls(vocab, n_docs, np.searchsorted(row, np.arange(len(vocab) + 1)).astype(np.int64),
+                   (pairs % n).astype(np.int32), idf[row] * tf / (K1 + tf), term_id)
+
+    @classmethod
+    def from_arrays(cls, a, vocab, term_id=None):
+        return cls(vocab, len(a["pages"]), a["bm25.indptr"], a["bm25.indices"], a["bm25.data"], term_id)
+
+    def arrays(self):
+        return {"bm25.indptr": self.indptr, "bm25.indices": self.indices, "bm25.data": self.data}
+
+    def prefix_rows(self, prefix):
+        """Row range [lo, hi) of the vocabulary terms starting with prefix."""
+        return bisect_left(self.vocab, prefix), bisect_left(self.vocab, prefix + "\U0010ffff")
+
+    def scores(self, weights, prefix=""):
+        """Per-chunk scores for {term: query weight}, plus the best-scoring completion
+        of prefix if given; None when nothing is in the vocabulary."""
+        rows = [(self.term_id[t], q) for t, q in weights.items() if t in self.term_id]
+        lo, hi = self.prefix_rows(prefix) if prefix else (0, 0)
+        if not rows and lo == hi:
+            return None
+        ptr = self.indptr
+        if rows:
+            cols = np.concatenate([self.indices[ptr[i]:ptr[i + 1]] for i, _ in rows])
+            vals = np.concatenate([self.data[ptr[i]:ptr[i + 1]] * q for i, q in rows])
+            scores = np.bincount(cols, weights=vals, minlength=self.n_docs)
+        else:
+            scores = np.zeros(self.n_docs)
+        if lo < hi:
+            best = np.zeros(self.n_docs)
+            np.maximum.at(best, self.indices[ptr[lo]:ptr[hi]], self.data[ptr[lo]:ptr[hi]])
+            scores += best
+        return scores
+
+    def top_k(self, weights, k, prefix=""):
+        """Indices of the k best-scoring chunks, ties in handbook order; [] when nothing matches."""
+        scores = self.scores(weights, prefix)
+        if scores is None:
+            return []
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            cutoff = np.partition(scores[hits], len(hits) - k)[len(hits) - k]
+            hits = hits[scores[hits] >= cutoff]
+        order = np.lexsort((hits, -scores[hits]))
+        return hits[order[:k]].tolist()
@@ -0,0 +1,147 @@
+"""The handbook's normalized fields, prepared once and stored as flat arrays.
+
+Parallel arrays, one slot per chunk: the lowercased text, its heading slice,
+the lowercased chapter name and each field's tokens as term ids into one
+sorted vocabulary. Token arrays are flat int32 arrays with offsets, CSR-style:
+field_tokens(f, d) is a view. Strings are kept the same way, as one UTF-8
+buffer plus offsets (see Strings), so every part of the index can be saved as
+plain arrays and memory-mapped back (see handbook.artifact).
+
+The postings, BM25 weights and anything else built over the handbook start
+from here instead of re-lowercasing and re-tokenizing the chunk dicts.
+"""
+import re
+
+import numpy as np
+
+HEADING_CHARS = 150
+TOKEN = re.compile(r"\w+")
+FIELDS = ("text", "heading", "chapter")
+
+class Strings:
+    """Read-only sequence of strings stored as one UTF-8 buffer plus offsets;
+    items are decoded on access."""
+    __slots__ = ("data", "offsets", "_view", "_bounds")
+
+    def __init__(self, data, offsets):
+        self.data    = data
+        self.offsets = offsets
+        # Slicing a memoryview skips numpy's per-index overhead
+        self._view   = memoryview(data)
+        self._bounds = offsets.tolist()
+
+    @classmethod
+    def of(cls, strings):
+        encoded = [s.encode() for s in strings]
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8),
+                   np.cumsum([0] + [len(b) for b in encoded], dtype=np.int64))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = range(len(self))[i]
+        return str(self._view[self._bounds[i]:self._bounds[i + 1]], "utf-8")
+
+class Chunks:
+    """The chunks as loaded, for display: {"page", "chapter", "text"} dicts, each
+    decoded the first time it is shown, so a process only holds the pages it serves."""
+    __slots__ = ("pages", "chapter", "text", "_dicts")
+
+    def __init__(self, pages, chapter, text):
+        self.pages   = pages
+        self.chapter = chapter
+        self.text    = text
+        self._dicts  = [None] * len(pages)
+
+    @classmethod
+    def of(cls, chunks):
+        return cls(np.array([c["page"] for c in chunks], dtype=np.int32),
+                   Strings.of(c["chapter"] for c in chunks), Strings.of(c["text"] for c in chunks))
+
+    @classmethod
+    def from_arrays(cls, a):
+        return cls(a["pages"], Strings(a["chunks.chapter"], a["chunks.chapter.offsets"]),
+                   Strings(a["chunks.text"], a["chunks.text.offsets"]))
+
+    def arrays(self):
+        return {"pages": self.pages,
+                "chunks.chapter": self.chapter.data, "chunks.chapter.offsets": self.chapter.offsets,
+                "chunks.text": self.text.data, "chunks.text.offsets": self.text.offsets}
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        c = self._dicts[i]
+        if c is None:
+            c = self._dicts[i] = {"page": int(self.pages[i]), "chapter": self.chapter[i], "text": self.text[i]}
+        return c
+
+class Fields:
+    __slots__ = ("pages", "text", "heading", "chapter", "vocab", "term_id", "tokens", "offsets")
+
+    def __init__(self, pages, text, heading, chapter, vocab, tokens, offsets):
+        self.pages   = pages
+        self.text    = text
+        self.heading = heading
+        self.chapter = chapter
+        self.vocab   = vocab
+        self.term_id = {t: i for i, t in enumerate(vocab)}
+        self.tokens  = tokens
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, chunks):
+        """Normalize and tokenize chunk dicts."""
+        strings = {"text": [c["text"].lower() for c in chunks]}
+        strings["heading"] = [t[:HEADING_CHARS] for t in strings["text"]]
+        strings["chapter"] = [c["chapter"].lower() for c in chunks]
+
+        words   = {f: [TOKEN.findall(s) for s in strings[f]] for f in FIELDS}
+        vocab   = sorted({t for f in FIELDS for doc in words[f] for t in doc})
+        term_id = {t: i for i, t in enumerate(vocab)}
+        tokens, offsets = {}, {}
+        for f in FIELDS:
+            tokens[f]  = np.array([term_id[t] for doc in words[f] for t in doc], dtype=np.int32)
+            offsets[f] = np.cumsum([0] + [len(doc) for doc in words[f]], dtype=np.int64)
+        return cls(np.array([c["page"] for c in chunks], dtype=np.int32),
+                   *(Strings.of(strings[f]) for f in FIELDS), vocab, tokens, offsets)
+
+    @classmethod
+    def from_arrays(cls, a, vocab):
+        return cls(a["pages"], *(Strings(a[f"fields.{f}"], a[f"fields.{f}.offsets"]) for f in FIELDS), vocab,
+                   {f: a[f"tokens.{f}"] for f in FIELDS}, {f: a[f"tokens.{f}.offsets"] for f in FIELDS})
+
+    def arrays(self):
+        a = {"pages": self.pages}
+        for f in FIELDS:
+            s = getattr(self, f)
+            a[f"fields.{f}"], a[f"fields.{f}.offsets"] = s.data, s.offsets
+            a[f"tokens.{f}"], a[f"tokens.{f}.offsets"] = self.tokens[f], self.offsets[f]
+        return a
+
+    def __len__(self):
+        return len(self.pages)
+
+    def field_tokens(self, field, d):
+        """Term ids of chunk d's field, in order."""
+        off = self.offsets[field]
+        return self.tokens[field][off[d]:off[d + 1]]
+
+    def lengths(self, field):
+        """Token count of field for every chunk."""
+        return np.diff(self.offsets[field])
+
+    def postings(self, field):
+        """Postings of field as CSR arrays (ptr, chunks, tfs): term i occurs tfs[j]
+        times in chunk chunks[j] for j in ptr[i]:ptr[i + 1], chunks ascending."""
+        n = max(len(self), 1)
+        docs = np.repeat(np.arange(len(self), dtype=np.int64), self.lengths(field))
+        pairs, tfs = np.unique(self.tokens[field].astype(np.int64) * n + docs, return_counts=True)
+        ptr = np.searchsorted(pairs // n, np.arange(len(self.vocab) + 1))
+        return ptr.astype(np.int64), (pairs % n).astype(np.int32), tfs.astype(np.int32)
@@ -0,0 +1,253 @@
+"""Inverted index over the handbook chunks.
+
+Built over the normalized fields of handbook.fields, ahead of time, and
+memory-mapped by every process from the artifact of handbook.artifact. Each
+field — the chunk text, its heading (the first HEADING_CHARS characters of the
+text) and its chapter name — has postings term -> (chunk, term frequency), so a
+query only touches the postings of the terms it matches instead of rescanning
+every chunk.
+
+Three ranking modes share the index. "bm25" (the default, see handbook.bm25)
+matches whole words and weights expansion synonyms below the words actually
+typed. "semantic" (see handbook.semantic) ranks by LSA similarity blended
+with the bm25 score, so paraphrases match, and falls back to bm25 when no
+query word is known to it.
+"keyword" is the handbook tab's original score: for every query word,
+the number of times it occurs in the lowercased text, plus 4x its occurrences
+in the heading and 3x in the chapter name. Occurrences are substring counts
+("pay" also counts inside "payment"): a query word is all word characters, so
+every occurrence falls inside one \\w+ run, and its count in a field is the sum
+over the field's terms of term.count(word) x term frequency. The terms
+containing a word are found through a trigram map of the vocabulary.
+
+Results are cached by normalized query — its weighted words, so "pay chart"
+and "Chart pay?" share an entry. Fixed queries (the tab's suggestion and
+chapter buttons) are pinned when the index loads; free-text queries go
+through a bounded LRU.
+
+search_incremental() serves search-as-you-type: the words already typed are
+searched as usual and the word still being typed matches every vocabulary
+term it is a prefix of (see handbook.bm25), so "commi" already finds
+"commission".
+"""
+import json
+import re
+from functools import cached_property, lru_cache
+
+import numpy as np
+
+from handbook import artifact
+from handbook.bm25 import BM25
+from handbook.fields import Chunks, Fields, FIELDS, HEADING_CHARS
+from handbook.semantic import LSA
+
+FIELD_WEIGHTS = {"text": 1, "heading": 4, "chapter": 3}
+EXPAND_CACHE_SIZE = 4096
+RESULT_CACHE_SIZE = 1024
+# Shortest half-typed word matched as a prefix; a stop word is not one
+PREFIX_MIN = 2
+MODES = ("bm25", "semantic", "keyword")
+# A field's postings, as saved: CSR arrays (see Fields.postings)
+POSTINGS = ("ptr", "chunks", "tfs")
+# Query weight of a synonym added through EXPANSIONS; typed words weigh 1
+EXPANSION_WEIGHT = 0.5
+
+QUERY_WORD = re.compile(r"\b\w{3,}\b")
+TRAILING_WORD = re.compile(r"\w+$")
+
+STOP_WORDS = frozenset({
+    "the", "and", "for", "are", "you", "that", "this", "with", "have", "from",
+    "they", "will", "what", "when", "how", "can", "our", "your", "was", "not",
+    "but", "all", "its", "been", "their", "has", "more", "also", "any", "into",
+})
+
+# Common synonyms/expansions, added when the key appears anywhere in the query
+EXPANSIONS = {
+    "5-step":     ["step", "five", "flow", "chart", "sales", "process"],
+    "five step":  ["step", "five", "flow", "chart", "sales", "process"],
+    "commission": ["pay", "chart", "gpm", "gross", "percent"],
+    "pay":        ["commission", "chart", "gpm", "gross", "percent", "salary"],
+    "paid":       ["pay", "commission", "chart", "gpm", "gross", "percent", "salary"],
+    "insurance":  ["claim", "adjuster", "storm", "damage", "hail"],
+    "warranty":   ["workmanship", "material", "gaf", "year", "coverage"],
+    "sop":        ["procedure", "operating", "standard", "process"],
+    "repair":     ["labor", "rate", "fix", "patch", "leak"],
+    "bid":        ["quote", "calculate", "price", "cost", "estimate"],
+}
+
+def query_weights(query, expansion_weight=EXPANSION_WEIGHT):
+    """{word: weight} a query searches for: its 3+ letter words minus stop words
+    at 1, plus the EXPANSIONS synonyms of any key it contains at expansion_weight."""
+    query_lower = query.lower()
+    weights = dict.fromkeys(set(QUERY_WORD.findall(query_lower)) - STOP_WORDS, 1.0)
+    for key, synonyms in EXPANSIONS.items():
+        if key in query_lower:
+            for s in synonyms:
+                weights.setdefault(s, expansion_weight)
+    return weights
+
+def query_key(weights):
+    """Hashable, order-independent form of query_weights() output."""
+    return tuple(sorted(weights.items()))
+
+def query_words(query):
+    """The set of words a query searches for, expansions included."""
+    return set(query_weights(query))
+
+def _trigrams(vocab):
+    """{3-char substring: ids of the vocabulary terms containing it}."""
+    grams = {}
+    for i, t in enumerate(vocab):
+        for g in {t[j:j + 3] for j in range(len(t) - 2)}:
+            grams.setdefault(g, []).append(i)
+    return grams
+
+def _gather(ptr, rows):
+    """Positions of CSR rows (ptr[i]:ptr[i + 1] for i in rows) concatenated, and each row's length."""
+    lo, n = ptr[rows], ptr[rows + 1] - ptr[rows]
+    return np.repeat(lo - np.cumsum(n) + n, n) + np.arange(n.sum()), n
+
+class HandbookIndex:
+    """The handbook chunks (as loaded, for display) plus their normalized fields,
+    per-field postings, BM25 weights and LSA vectors; read-only once built and
+    shared by every session."""
+
+    def __init__(self, chunks):
+        """Build the index from chunk dicts ({"page", "chapter", "text"})."""
+        norm     = Fields.build(chunks)
+        postings = {f: norm.postings(f) for f in FIELDS}
+        bm25     = BM25.build(norm.vocab, postings, {f: norm.lengths(f) for f in FIELDS}, norm.term_id)
+        self._attach(Chunks.of(chunks), norm, postings, bm25, LSA.build(norm, STOP_WORDS) if chunks else None)
+
+    def _attach(self, chunks, norm, postings, bm25, lsa):
+        self.chunks = chunks
+        self.norm   = norm
+        self.vocab  = norm.vocab
+        self.fields = postings
+        self.bm25   = bm25
+        self.lsa    = lsa
+        self.expand = lru_cache(maxsize=EXPAND_CACHE_SIZE)(self._expand)
+        self.pinned = {}
+        self.ranked = lru_cache(maxsize=RESULT_CACHE_SIZE)(self._ranked)
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        """The index over arrays() and meta(), as saved by save() and memory-mapped by
+        handbook.artifact.load()."""
+        norm     = Fields.from_arrays(arrays, meta["vocab"])
+        postings = {f: tuple(arrays[f"postings.{f}.{k}"] for k in POSTINGS) for f in FIELDS}
+        lsa      = LSA.from_arrays(arrays, meta["lsa_vocab"]) if meta["lsa_vocab"] is not None else None
+        index = cls.__new__(cls)
+        index._attach(Chunks.from_arrays(arrays), norm, postings,
+                      BM25.from_arrays(arrays, norm.vocab, norm.term_id), lsa)
+        return index
+
+    @classmethod
+    def from_file(cls, path, index_dir=None):
+        """The index of a chunks file, memory-mapped from its artifact under index_dir;
+        built from the JSON and saved there first when the file's contents have no
+        artifact yet (in memory only without index_dir, or if it cannot be written)."""
+        with open(path, "rb") as f:
+            data = f.read()
+        if not index_dir:
+            return cls(json.loads(data))
+        source = artifact.source_hash(data)
+        key    = artifact.build_key(source, STOP_WORDS)
+        saved  = artifact.load(index_dir, key)
+        if saved is None:
+            index = cls(json.loads(data))
+            try:
+                index.save(index_dir, source)
+            except OSError:
+                return index  # read-only checkout: keep the in-memory index
+            # Map the saved copy, so this process shares its pages with the others
+            saved = artifact.load(index_dir, key)
+            if saved is None:
+                return index
+        return cls.from_arrays(*saved)
+
+    def arrays(self):
+        """Everything the index is made of, as {name: ndarray} (see from_arrays())."""
+        arrays = {**self.chunks.arrays(), **self.norm.arrays(), **self.bm25.arrays()}
+        for f, csr in self.fields.items():
+            arrays.update(zip((f"postings.{f}.{k}" for k in POSTINGS), csr))
+        if self.lsa is not None:
+            arrays.update(self.lsa.arrays())
+        return arrays
+
+    def meta(self):
+        return {"chunks": len(self), "vocab": self.vocab, "lsa_vocab": self.lsa.vocab if self.lsa else None}
+
+    def save(self, index_dir, source):
+        """Write the index's artifact for source (the chunks file's hash) under index_dir; returns its directory."""
+        return artifact.save(index_dir, artifact.build_key(source, STOP_WORDS), self.arrays(), self.meta())
+
+    def __len__(self):
+        return len(self.chunks)
+
+    @cached_property
+    def grams(self):
+        """Trigram map of the vocabulary, for keyword mode; built on first use."""
+        return _trigrams(self.vocab)
+
+    def _expand(self, word):
+        """(term id, occurrences of word in term) for every vocabulary term containing word."""
+        candidates = min((self.grams.get(word[j:j + 3], ()) for j in range(len(word) - 2)), key=len)
+        vocab = self.vocab
+        return tuple((i, vocab[i].count(word)) for i in candidates if word in vocab[i])
+
+    def scores(self, words):
+        """Per-chunk scores for words (0 where none matches)."""
+        scores = np.zeros(len(self))
+        hits = [hit for w in words for hit in self.expand(w)]
+        if not hits:
+            return scores
+        terms, counts = np.array(hits).T
+        for field, weight in FIELD_WEIGHTS.items():
+            ptr, docs, tfs = self.fields[field]
+            pos, n = _gather(ptr, terms)
+            scores += np.bincount(docs[pos], weights=np.repeat(counts * weight, n) * tfs[pos], minlength=len(self))
+        return scores
+
+    def _ranked(self, key, top_k, mode, prefix=""):
+        """Chunk indices ranked for a query_key() and optional prefix (bm25 only);
+        cached through self.ranked."""
+        weights = dict(key)
+        if mode == "semantic" and self.lsa is not None and not prefix:
+            ranked = self.lsa.top_k(weights, top_k, self.bm25.scores(weights))
+            if ranked:
+                return tuple(ranked)
+            mode = "bm25"
+        if mode in ("bm25", "semantic"):
+            return tuple(self.bm25.top_k(weights, top_k, prefix))
+        if mode == "keyword":
+            scores = self.scores(weights)
+            hits = np.flatnonzero(scores)
+            return tuple(hits[np.lexsort((hits, -scores[hits]))[:top_k]].tolist())
+        raise ValueError(f"unknown ranking mode {mode!r}; expected one of {MODES}")
+
+    def pin(self, queries, top_k=10, mode="bm25"):
+        """Rank queries now and keep their results outside the LRU, for fixed queries."""
+        for q in queries:
+            key = (query_key(query_weights(q)), top_k, mode)
+            self.pinned[key] = self._ranked(*key)
+
+    def search(self, query, top_k=10, mode="bm25"):
+        """The top_k best-ranked chunks (ties in handbook order); the first top_k if nothing matches."""
+        weights = query_weights(query)
+        if not weights:
+            return self.chunks[:top_k]
+        key = (query_key(weights), top_k, mode)
+        ranked = self.pinned[key] if key in self.pinned else self.ranked(*key)
+        return [self.chunks[d] for d in ranked] or self.chunks[:top_k]
+
+    def search_incremental(self, text, top_k=10):
+        """BM25 results for partially typed text, its last word matched as a prefix
+        while it is still being typed; [] until there is something to match."""
+        text_lower = text.lower()
+        m = TRAILING_WORD.search(text_lower)
+        prefix = m.group() if m and len(m.group()) >= PREFIX_MIN and m.group() not in STOP_WORDS else ""
+        weights = query_weights(text_lower[:m.start()] if m else text_lower)
+        if not weights and not prefix:
+            return []
+        return [self.chunks[d] for d in self.ranked(query_key(weights), top_k, "bm25", prefix)]
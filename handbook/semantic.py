@@ -0,0 +1,122 @@
+"""Semantic (LSA) retrieval for the handbook, fully offline.
+
+Each chunk's text and chapter become a TF-IDF vector (sublinear tf, smoothed
+idf, stop words and words under 3 letters dropped), and a truncated SVD maps
+them into LSA_DIMS latent dimensions where words that keep the same company
+land close together, so a question can find a chunk that words it differently.
+A query is folded into the same space through the term matrix and ranked
+against every chunk with a single matrix-vector product. The chunks' BM25F
+scores for the same query are blended in (scaled so the best match scores 1,
+at LEXICAL_WEIGHT): on a handbook this size LSA alone drifts towards pages
+that merely share the question's filler words, and the blend keeps the pages
+that actually use its terms, or their EXPANSIONS synonyms, near the top.
+
+The SVD goes through the chunks' Gram matrix (chunks x chunks, built from the
+postings), which stays small however large the vocabulary grows.
+
+The vectors are built ahead of time with the rest of the index and
+memory-mapped from its artifact (see handbook.artifact):
+
+    lsa.docs    chunks x dims, rows unit length
+    lsa.terms   terms x dims, the query fold-in matrix
+    lsa.idf     per-term idf
+"""
+import numpy as np
+
+# About half the chunk count: enough to keep topics apart, few enough to merge
+# words that share contexts (at the chunk count itself LSA is plain TF-IDF)
+LSA_DIMS = 64
+MIN_WORD = 3
+# BM25F share of the semantic score; cosine similarity and the scaled BM25F
+# score both run 0-1, so 1.0 weighs them equally
+LEXICAL_WEIGHT = 1.0
+
+def _tfidf(fields, stop_words):
+    """(doc ids, term ids, weights) of the L2-normalized TF-IDF matrix, plus vocab and idf."""
+    keep = np.array([len(t) >= MIN_WORD and t not in stop_words and not t.isdigit() for t in fields.vocab])
+    docs, terms = [], []
+    for f in ("text", "chapter"):
+        lengths = fields.lengths(f)
+        docs.append(np.repeat(np.arange(len(lengths)), lengths))
+        terms.append(fields.tokens[f])
+    docs, terms = np.concatenate(docs), np.concatenate(terms)
+    docs, terms = docs[keep[terms]], terms[keep[terms]]
+
+    # tf per (doc, term); pairs sorted by doc then term
+    pairs, tf = np.unique(docs.astype(np.int64) * len(fields.vocab) + terms, return_counts=True)
+    d, t = pairs // len(fields.vocab), pairs % len(fields.vocab)
+    used, t = np.unique(t, return_inverse=True)
+    df  = np.bincount(t, minlength=len(used))
+    n   = len(fields)
+    idf = np.log((1 + n) / (1 + df)) + 1
+    w   = (1 + np.log(tf)) * idf[t]
+    w  /= np.sqrt(np.bincount(d, weights=w * w, minlength=n))[d]
+    return d, t, w, [fields.vocab[i] for i in used], idf
+
+class LSA:
+    __slots__ = ("vocab", "term_id", "idf", "terms", "docs")
+
+    def __init__(self, vocab, idf, terms, docs):
+        self.vocab   = vocab
+        self.term_id = {t: i for i, t in enumerate(vocab)}
+        self.idf     = idf
+        self.terms   = terms
+        self.docs    = docs
+
+    @classmethod
+    def build(cls, fields, stop_words=(), dims=LSA_DIMS):
+        d, t, w, vocab, idf = _tfidf(fields, frozenset(stop_words))
+        n = len(fields)
+        # Gram matrix X X^T, one outer product per term's postings
+        gram  = np.zeros((n, n))
+        order = np.argsort(t, kind="stable")
+        bounds = np.searchsorted(t[order], np.arange(len(vocab) + 1))
+        for i in range(len(vocab)):
+            sel = order[bounds[i]:bounds[i + 1]]
+            gram[np.ix_(d[sel], d[sel])] += np.outer(w[sel], w[sel])
+        eigval, eigvec = np.linalg.eigh(gram)
+        top = np.argsort(eigval)[::-1][:dims]
+        top = top[eigval[top] > 1e-10]
+        s, u = np.sqrt(eigval[top]), eigvec[:, top]
+        # Term matrix V = X^T U / s; chunk coordinates X V = U s
+        terms = np.zeros((len(vocab), len(top)))
+        np.add.at(terms, t, w[:, None] * u[d])
+        terms /= s
+        docs = u * s
+        docs /= np.maximum(np.linalg.norm(docs, axis=1, keepdims=True), 1e-12)
+        return cls(vocab, idf.astype(np.float32), terms.astype(np.float32), docs.astype(np.float32))
+
+    @classmethod
+    def from_arrays(cls, a, vocab):
+        return cls(vocab, a["lsa.idf"], a["lsa.terms"], a["lsa.docs"])
+
+    def arrays(self):
+        return {"lsa.docs": self.docs, "lsa.terms": self.terms, "lsa.idf": self.idf}
+
+    def query_vector(self, weights):
+        """Unit query vector in LSA space for {word: weight}; None when no word is known."""
+        rows = [(self.term_id[t], q) for t, q in weights.items() if t in self.term_id]
+        if not rows:
+            return None
+        ids = [i for i, _ in rows]
+        q = np.array([q for _, q in rows], dtype=np.float32) * self.idf[ids]
+        v = q @ self.terms[ids]
+        norm = np.linalg.norm(v)
+        return v / norm if norm > 0 else None
+
+    def top_k(self, weights, k, lexical=None):
+        """Indices of the k chunks most similar to the query, ties in handbook order; [] when
+        the query has no known word or nothing is similar. lexical, if given, is the
+        chunks' keyword scores for the query (BM25.scores()), blended in at LEXICAL_WEIGHT."""
+        v = self.query_vector(weights)
+        if v is None:
+            return []
+        sims = self.docs @ v
+        if lexical is not None and lexical.max() > 0:
+            sims = sims + LEXICAL_WEIGHT * (lexical / lexical.max())
+        hits = np.flatnonzero(sims > 0)
+        if len(hits) > k:
+            cutoff = np.partition(sims[hits], len(hits) - k)[len(hits) - k]
+            hits = hits[sims[hits] >= cutoff]
+        order = np.lexsort((hits, -sims[hits]))
+        return hits[order[:k]].tolist()
@@ -0,0 +1,307 @@
+"""HTML builders for pricing tables and client presentation cards.
+
+Plain string rendering with no Streamlit import, so the app, scripts and
+benchmarks can all call it.
+"""
+from functools import lru_cache
+
+from pricing import per_sq, tier_rates, PRODUCTS, TIERS, PITCH_BUCKET_LABELS
+
+TIER_CLS = {
+    "Signature":"tier-sig","Gold":"tier-gld","Silver":"tier-sil","Bronze":"tier-brz",
+    "3-Star Land":"tier-sil","3-Star Pro":"tier-sil","4-Star Land":"tier-gld","4-Star Pro":"tier-gld",
+    "OC Dur":"tier-sig","Royal Sov":"tier-sil","Prud":"tier-gld",
+}
+
+# ─── TABLES ─────────────────────────────────────────────────────────
+# Every pricing table is fixed markup around a run of rows that differ only in
+# their cell values. Each table's row is a function returning one f-string;
+# rendering is a list comprehension over the rows plus a single join, memoized
+# on the row tuple so an unchanged table costs one dict lookup. A miss renders
+# about as fast as a plain += loop; the memo is where the time is saved.
+TABLE_CACHE_SIZE = 256
+
+def compile_table(head, row, tail, prepare=None, cache_size=TABLE_CACHE_SIZE):
+    """render(rows, *args) -> head + one formatted row per row tuple + tail.
+
+    row(*fields) returns one row's markup, typically a lambda around an f-string.
+    Without prepare, rows is a tuple of field tuples. With it, rows and args are
+    passed through prepare(rows, *args), which yields the field tuples, so the
+    memo is keyed on the caller's own hashable inputs and the derived fields are
+    only built on a miss. The uncached renderer is render.__wrapped__.
+    """
+    @lru_cache(maxsize=cache_size)
+    def render(rows, *args):
+        return "".join([head, *[row(*r) for r in (prepare(rows, *args) if prepare else rows)], tail])
+    return render
+
+_PRICE_HEAD = '<div class="cardb"><table class="ptbl"><thead><tr><th>Level</th><th>GPM</th><th>Sale Price</th>{}</tr></thead><tbody>'
+_PRICE_TAIL = '</tbody></table></div>'
+
+def _price_fields(rows, std_tsq=None):
+    """(class, label, GPM, price[, per SQ]) per price_rows row; per SQ only when std_tsq is given."""
+    if std_tsq is None:
+        return [("finr" if is_fin else "hlr" if i == 0 else "", label, m_lbl, p)
+                for i, (label, m_lbl, p, is_fin) in enumerate(rows)]
+    return [("finr" if is_fin else "hlr" if i == 0 else "", label, m_lbl, p,
+             f"${per_sq(p, std_tsq):,}/SQ" if std_tsq > 0 else "")
+            for i, (label, m_lbl, p, is_fin) in enumerate(rows)]
+
+PRICE_TABLE = compile_table(_PRICE_HEAD.format(""),
+                            lambda cls, label, gpm, p: f'<tr class="{cls}"><td>{label}</td><td>{gpm}</td><td class="big">${p:,.0f}</td></tr>',
+                            _PRICE_TAIL, _price_fields)
+PRICE_TABLE_SQ = compile_table(_PRICE_HEAD.format("<th>Per SQ</th>"),
+                               lambda cls, label, gpm, p, sq: f'<tr class="{cls}"><td>{label}</td><td>{gpm}</td><td class="big">${p:,.0f}</td><td>{sq}</td></tr>',
+                               _PRICE_TAIL, _price_fields)
+
+def render_table(rows, std_tsq, show_sq=True):
+    rows = tuple(rows)
+    return PRICE_TABLE_SQ(rows, std_tsq) if show_sq else PRICE_TABLE(rows)
+
+_REPAIR_SEP = '<tr><td colspan="3"><hr style="border-color:#d0d5e0;margin:2px 0;"></td></tr>'
+
+REPAIR_TABLE = compile_table(
+    """<div class="cardb">
+              <table class="ptbl">
+                <thead><tr><th>Level</th><th>GPM</th><th>Sale Price</th></tr></thead>
+                <tbody>""",
+    lambda cls, label, gpm, p, sep: f'<tr{cls}><td>{label}</td><td>{gpm}</td><td class="big">${p:,.0f}</td></tr>{sep}',
+    """</tbody>
+              </table>
+            </div>
+            """,
+    lambda rows, n_custom: [(' class="finr"' if is_fin else (' class="hlr"' if i < n_custom else ""),
+                             label, m_lbl, p, _REPAIR_SEP if n_custom and i == n_custom - 1 else "")
+                            for i, (label, m_lbl, p, is_fin) in enumerate(rows)])
+
+def render_repair_table(rows, n_custom=0):
+    """Repair pricing breakdown; the first n_custom rows are highlighted and set off by a rule."""
+    return REPAIR_TABLE(tuple(rows), n_custom)
+
+TICKS = '<div style="display:flex;justify-content:space-between;margin:-10px 0 10px 0;padding:0 4px;"><div style="text-align:center"><div style="width:1px;height:6px;background:#d0d5e0;margin:0 auto 2px"></div><span style="font-size:.65rem;color:#666">0%</span></div><div style="text-align:center"><div style="width:1px;height:6px;background:#b92227;margin:0 auto 2px"></div><span style="font-size:.65rem;color:#b92227">25%</span></div><div style="text-align:center"><div style="width:1px;height:6px;background:#b92227;margin:0 auto 2px"></div><span style="font-size:.65rem;color:#b92227">50%</span></div><div style="text-align:center"><div style="width:1px;height:6px;background:#b92227;margin:0 auto 2px"></div><span style="font-size:.65rem;color:#b92227">75%</span></div><div style="text-align:center"><div style="width:1px;height:6px;background:#d0d5e0;margin:0 auto 2px"></div><span style="font-size:.65rem;color:#666">100%</span></div></div>'
+
+CPO_DATA = {
+    "Workmanship":    ["15 Year", "15 Year", "15 Year (10 backed by GAF)", "25 Year (25 backed by GAF)"],
+    "Material/Labor": ["50 Year (Pro-rated)", "50 Year (Not Pro-rated)", "50 Year (Not Pro-rated)", "50 Year (Not Pro-rated)"],
+    "Flashing":       ["R&R Step Flashing as needed", "R&R Step Flashing as needed", "R&R Step Flashing as needed", "Replace ALL step flashing"],
+    "Sewer Pipe":     ["Standard", "Standard", "Standard", "Upgrade to Perma Boots"],
+}
+
+CPO_TABLE = compile_table(
+    """
+    <div class="card">
+      <table class="wtbl">
+        <thead><tr><th>Feature</th><th class="tier-sig">Signature</th><th class="tier-brz">Bronze</th><th class="tier-sil">Silver</th><th class="tier-gld">Gold</th></tr></thead>
+        <tbody>""",
+    lambda feature, sig, brz, sil, gld: f"<tr><td><strong>{feature}</strong></td><td>{sig}</td><td>{brz}</td><td>{sil}</td><td>{gld}</td></tr>",
+    """</tbody>
+      </table>
+    </div>""")
+
+def render_cpo_table():
+    """HDZ CPO tier comparison."""
+    return CPO_TABLE(tuple((feature, *vals) for feature, vals in CPO_DATA.items()))
+
+RATE_TABLE = compile_table(
+    f"""
+    <div class="card">
+      <table class="wtbl">
+        <thead><tr><th>Product</th><th>Tier</th>{"".join(f"<th>{b}</th>" for b in PITCH_BUCKET_LABELS)}</tr></thead>
+        <tbody>""",
+    lambda prod, tier, r1, r2, r3: f"<tr><td>{prod}</td><td>{tier}</td><td>${r1}</td><td>${r2}</td><td>${r3}</td></tr>",
+    """</tbody>
+      </table>
+    </div>""")
+
+def rate_rows():
+    """(product, tier, rate 4-7, rate 8-10, rate 11+) for every product tier."""
+    return tuple((prod, tier, *tier_rates(prod, tier)) for prod in PRODUCTS for tier in TIERS[prod])
+
+def render_rate_table():
+    """Per-SQ rate reference for every product and tier."""
+    return RATE_TABLE(rate_rows())
+
+TIER_PACKAGE_NAMES = {
+    "Signature":  "Signature Protection",
+    "Bronze":     "Bronze Protection",
+    "Silver":     "Silver Protection",
+    "Gold":       "Gold Protection",
+    "3-Star Land":"3-Star Landmark",
+    "3-Star Pro": "3-Star Landmark Pro",
+    "4-Star Land":"4-Star Landmark",
+    "4-Star Pro": "4-Star Landmark Pro",
+    "OC Dur":     "OC Duration Tru Definition",
+    "Royal Sov":  "GAF Royal Sovereign",
+    "Prud":       "Prudential Roof System",
+}
+
+TIER_FEATURES = {
+    "Signature": [
+        "50-Year Limited Lifetime Labor & Material Warranty through GAF",
+        "15-Year Leak & Workmanship Warranty through Accent Roofing Service",
+        "Unlimited Wind Rating + Class 3 Impact Resistance",
+        "25-Year Algae Stainguard Warranty",
+        "More roof for your money — a full system without the cost competitors charge for",
+    ],
+    "Bronze": [
+        "50-Year Non Pro-Rated Material Warranty through GAF",
+        "15-Year Leak & Workmanship Warranty through Accent Roofing Service",
+        "Unlimited Wind Rating + Class 3 Impact Resistance",
+        "25-Year Algae Stainguard Warranty",
+        "Exclusively available through GAF Master Elite Contractors (top 2%)",
+    ],
+    "Silver": [
+        "50-Year Non Pro-Rated Material Warranty through GAF",
+        "15-Year Leak Warranty (10 Yrs GAF + 5 Yrs ARS)",
+        "Unlimited Wind Rating + Class 3 Impact Resistance",
+        "GAF Felt Buster Underlayment — 40x Stronger than Standard Felt",
+        "All Step Flashing Replaced Included",
+    ],
+    "Gold": [
+        "50-Year Non Pro-Rated Material Warranty through GAF",
+        "25-Year Leak & Workmanship Warranty — the Strongest Available",
+        "Unlimited Wind Rating + Class 3 Impact Resistance",
+        "GAF WeatherWatch Ice & Water Shield + Felt Buster Underlayment",
+        "Perma-Boot Sewer Pipe Covers + All Step Flashing Replaced",
+    ],
+    "3-Star Land": [
+        "Lifetime Labor & Material Warranty through CertainTeed with 20-Year Sure Start Protection",
+        "15-Year Leak & Workmanship Warranty through Accent Roofing Service",
+        "25-Year StreakFighter Algae Protection Warranty",
+        "UL Class 3 Impact Resistance — Rated to 130 MPH Winds",
+        "CertainTeed Roof Runner Synthetic Felt — 40x Stronger than Standard",
+    ],
+    "3-Star Pro": [
+        "50-Year Labor & Material Warranty — Heavier Shingle with Enhanced Color Variation",
+        "15-Year Leak & Workmanship Warranty through Accent Roofing Service",
+        "25-Year StreakFighter Algae Protection Warranty",
+        "UL Class 3 Impact Resistance — Rated to 130 MPH Winds",
+        "CertainTeed Roof Runner Synthetic Felt — 40x Stronger than Standard",
+    ],
+    "4-Star Land": [
+        "Comprehensive 50-Year Labor & Material Warranty through CertainTeed",
+        "15-Year Leak & Workmanship Warranty through Accent Roofing Service",
+        "25-Year StreakFighter Algae Protection + UL Class 3 Impact Resistance",
+        "130 MPH Wind Resistance Rating",
+        "CertainTeed Swift Start Starter Shingles + Shadow Ridge Hip & Ridge Caps",
+    ],
+    "4-Star Pro": [
+        "50-Year Warranty on a Heavier, Premium Shingle with Richer Color Depth",
+        "15-Year Leak & Workmanship Warranty through Accent Roofing Service",
+        "25-Year StreakFighter Algae Protection + UL Class 3 Impact Resistance",
+        "130 MPH Wind Resistance Rating",
+        "CertainTeed Swift Start Starter Shingles + Shadow Ridge Hip & Ridge Caps",
+    ],
+    "OC Dur": [
+        "Limited Lifetime Labor & Material Warranty through Owens Corning",
+        "15-Year Leak & Workmanship Warranty through Accent Roofing Service",
+        "25-Year Algae Stain Guard Warranty",
+        "130 MPH Wind Rating + Impact Resistance",
+        "OC VentSure Ridge Vent + ProEdge Hip & Ridge Caps Included",
+    ],
+    "Royal Sov": [
+        "25-Year Labor & Material Warranty through GAF",
+        "10-Year Leak & Workmanship Warranty through Accent Roofing Service",
+        "Budget-Friendly 3-Tab Option with Proven GAF Quality",
+        "Cobra III Ridge Vent System Included for Attic Ventilation",
+        "Dedicated On-Site Project Manager at No Extra Charge",
+    ],
+    "Prud": [
+        "Limited Lifetime Material & Labor Warranty through CertainTeed",
+        "5-Year Leak & Workmanship Warranty through Accent Roofing Service",
+        "15-Year Algae Fighter Warranty",
+        "Available in Moire Black and Weathered Wood — Color-Matched Drip Edge Included",
+        "Ridge Vent System Replaces Old Box Vents for Superior Attic Airflow",
+    ],
+}
+
+CPO_DISPLAY_ORDER = ["Signature", "Bronze", "Silver", "Gold"]
+
+TIER_BADGE_COLORS = {
+    "Signature":  ("#b99f2a", "#1a1700"),
+    "Bronze":     ("#8b5a3c", "#1a0f00"),
+    "Silver":     ("#7a8fa3", "#111622"),
+    "Gold":       ("#b92227", "#1a0f00"),
+    "3-Star Land":("#2d7a3a", "#051208"),
+    "3-Star Pro": ("#1e7a5a", "#051210"),
+    "4-Star Land":("#1e4d7b", "#050d18"),
+    "4-Star Pro": ("#4a2d7b", "#0a0518"),
+    "OC Dur":     ("#b99f2a", "#1a1700"),
+    "Royal Sov":  ("#7a8fa3", "#111622"),
+    "Prud":       ("#2d7a3a", "#051208"),
+}
+
+# ─── PRESENTATION CARDS ─────────────────────────────────────────────
+# Everything on a tier card except the two prices is fixed per tier, so each
+# card is rendered once into (head, middle, tail) around the cash and finance
+# price slots. Whole presentations are then cached on their inputs.
+PRESENTATION_CACHE_SIZE = 256
+
+_FIN_EMPTY = '<div style="margin-top:10px;padding-top:10px;border-top:1px solid #d0d5e0;min-height:20px;"></div>'
+_FIN_HEAD = (
+    '<div style="margin-top:10px;padding-top:10px;border-top:1px solid #d0d5e0;">'
+    '<div style="font-size:.65rem;color:#666;text-transform:uppercase;letter-spacing:.08em;margin-bottom:3px;">Finance Option</div>'
+    '<div style="font-family:\'Barlow Condensed\',sans-serif;font-size:1.4rem;font-weight:700;color:#1e4d7b;">$'
+)
+_FIN_TAIL = '</div></div>'
+
+def _card_template(tier):
+    pkg_name  = TIER_PACKAGE_NAMES.get(tier, tier)
+    features  = TIER_FEATURES.get(tier, [])
+    badge_fg, badge_bg = TIER_BADGE_COLORS.get(tier, ("#ffffff", "#1e3158"))
+
+    feat_html = "".join(
+        f'<div style="display:flex;align-items:flex-start;gap:8px;margin-bottom:7px;">'
+        f'<span style="color:#2d5a1a;font-size:.85rem;margin-top:1px;flex-shrink:0;">✓</span>'
+        f'<span style="font-size:.82rem;color:#2c3e50;line-height:1.3;">{f}</span>'
+        f'</div>'
+        for f in features
+    )
+
+    head = f"""
+        <div style="background:#fff;border:1px solid #d0d5e0;border-radius:10px;padding:20px;flex:1;min-width:160px;display:flex;flex-direction:column;box-shadow:0 2px 8px rgba(30,49,88,0.1);">
+          <div style="background:{badge_bg};border:1px solid {badge_fg}44;border-radius:6px;padding:6px 10px;margin-bottom:14px;text-align:center;">
+            <div style="font-family:'Barlow Condensed',sans-serif;font-size:.65rem;font-weight:700;letter-spacing:.12em;text-transform:uppercase;color:{badge_fg};margin-bottom:1px;">{tier}</div>
+            <div style="font-size:.75rem;color:{badge_fg}cc;">{pkg_name}</div>
+          </div>
+          <div style="margin-bottom:14px;">
+            <div style="font-size:.62rem;color:#666;text-transform:uppercase;letter-spacing:.08em;margin-bottom:3px;">Cash Price</div>
+            <div style="font-family:'Barlow Condensed',sans-serif;font-size:2rem;font-weight:800;color:#1e3158;line-height:1;">$"""
+    middle = f"""</div>
+          </div>
+          <div style="flex:1;margin-bottom:4px;">{feat_html}</div>
+          """
+    return head, middle, "\n        </div>"
+
+CARD_TEMPLATES = {tier: _card_template(tier) for tier in TIER_PACKAGE_NAMES}
+
+def _card(tier, cash_price, fin_price, financing):
+    head, middle, tail = CARD_TEMPLATES.get(tier) or _card_template(tier)
+    if financing and fin_price and isinstance(fin_price, (int, float)):
+        fin_html = f"{_FIN_HEAD}{fin_price:,.0f}{_FIN_TAIL}"
+    else:
+        fin_html = _FIN_EMPTY
+    return f"{head}{cash_price:,.0f}{middle}{fin_html}{tail}"
+
+def render_cpo_presentation(client_name, product, tiers_with_prices, financing=True):
+    """Render a client-facing CPO presentation card grid."""
+    return _render_cpo(client_name, product, tuple(tiers_with_prices.items()), bool(financing))
+
+@lru_cache(maxsize=PRESENTATION_CACHE_SIZE)
+def _render_cpo(client_name, product, prices, financing):
+    prices = dict(prices)
+    display_tiers = [t for t in CPO_DISPLAY_ORDER if t in prices]
+    if not display_tiers:
+        display_tiers = list(prices)
+
+    cards_html = "".join(_card(tier, *prices[tier], financing) for tier in display_tiers)
+
+    client_line = f'<div style="font-size:.78rem;color:#666;margin-bottom:14px;letter-spacing:.04em;">Prepared for: <strong style="color:#1e3158;">{client_name}</strong> &nbsp;·&nbsp; {product}</div>' if client_name and client_name != "—" else f'<div style="font-size:.78rem;color:#666;margin-bottom:14px;">{product}</div>'
+
+    return f"""
+    <div style="background:#fff;border:1px solid #d0d5e0;border-radius:10px;padding:20px;">
+      <div style="font-family:'Barlow Condensed',sans-serif;font-size:.7rem;font-weight:700;letter-spacing:.14em;text-transform:uppercase;color:#b92227;margin-bottom:6px;">Client Presentation</div>
+      {client_line}
+      <div style="display:flex;gap:12px;flex-wrap:wrap;">{cards_html}</div>
+      <div style="margin-top:14px;font-size:.68rem;color:#666;text-align:center;">Prices include all labor, materials, and cleanup. Ask your representative about available financing options.</div>
+    </div>"""
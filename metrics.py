@@ -0,0 +1,257 @@
+"""Per-rerun wall-time metrics for the app's major sections.
+
+Each section (login gate, CSS, every tab body, handbook search, the jobs
+catalogue load and filter, ...) feeds a process-wide histogram, and every
+rerun — a full script run or a single tab's fragment rerun — produces one
+record of how long each section took in that run.
+
+If METRICS_DIR is set, each rerun record is appended to METRICS_DIR/reruns.jsonl
+and the histograms are rewritten to METRICS_DIR/timings.prom (Prometheus text
+format, at most every EXPORT_INTERVAL seconds), for node_exporter's textfile
+collector or any log shipper. The sidebar admin panel reads the same data.
+
+Reruns also tally what each view sends to the browser: bytes of raw HTML and
+element counts (jobs grid cards, repair inputs, ...). Totals are kept for the
+process and, through a caller-supplied sink dict, per session.
+
+No Streamlit import; scripts and the pricing service can time themselves too.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+# Upper bounds in seconds, as Prometheus histograms expect
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+EXPORT_INTERVAL = 15
+RECENT_RERUNS = 50
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+
+log = logging.getLogger(__name__)
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last slot is +Inf
+        self.count  = 0
+        self.sum    = 0.0
+        self.max    = 0.0
+
+    def observe(self, seconds):
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum   += seconds
+        self.max    = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Upper bucket bound holding the q-th observation (max for the +Inf bucket)."""
+        if not self.count:
+            return 0.0
+        seen = 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if seen >= q * self.count:
+                return min(bound, self.max)
+        return self.max
+
+_lock       = threading.Lock()
+_histograms = {}
+_recent     = deque(maxlen=RECENT_RERUNS)
+_payload    = {}
+_last_export = 0.0
+# The rerun in progress is thread-local state: each session's reruns run on its
+# own script thread, one at a time. That thread is reused from rerun to rerun,
+# and a rerun cut short (st.rerun(), st.stop(), a newer rerun) never reaches
+# end_rerun(), so a record can be left open: begin_rerun() starts over, and
+# rerun_section() drops a script record still open in a fragment-only rerun.
+_run = threading.local()
+
+def observe(section, seconds):
+    with _lock:
+        h = _histograms.get(section)
+        if h is None:
+            h = _histograms[section] = Histogram()
+        h.observe(seconds)
+    sections = getattr(_run, "sections", None)
+    if sections is not None:
+        sections[section] = sections.get(section, 0.0) + seconds
+
+@contextmanager
+def timed(section):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(section, time.perf_counter() - t0)
+
+def timed_fn(section):
+    """Decorator form of timed()."""
+    def wrap(fn):
+        @wraps(fn)
+        def run(*args, **kwargs):
+            with timed(section):
+                return fn(*args, **kwargs)
+        return run
+    return wrap
+
+# ─── RERUNS ─────────────────────────────────────────────────────────
+def in_rerun():
+    return getattr(_run, "sections", None) is not None
+
+def begin_rerun(kind="script", sink=None):
+    """Start a rerun record; sink, if given, also receives its payload tallies."""
+    _run.kind     = kind
+    _run.sections = {}
+    _run.payload  = {}
+    _run.view     = "page"
+    _run.sink     = sink
+    _run.t0 = _run.lap = time.perf_counter()
+
+def lap(section):
+    """Record the time since begin_rerun() or the previous lap() as section."""
+    now = time.perf_counter()
+    observe(section, now - _run.lap)
+    _run.lap = now
+
+def end_rerun(**labels):
+    """Close the rerun in progress; returns its record (None if none was open)."""
+    if not in_rerun():
+        return None
+    total = time.perf_counter() - _run.t0
+    sections, _run.sections = _run.sections, None
+    payload,  _run.payload  = _run.payload, None
+    observe("rerun" if _run.kind == "script" else "fragment_rerun", total)
+    record = dict(labels, ts=round(time.time(), 3), kind=_run.kind, total_ms=round(total * 1000, 2),
+                  sections={k: round(v * 1000, 2) for k, v in sections.items()})
+    if payload:
+        record["payload"] = payload
+    with _lock:
+        _recent.append(record)
+        merge_payload(_payload, payload)
+    if _run.sink is not None:
+        merge_payload(_run.sink, payload)
+    if METRICS_DIR:
+        export(record)
+    return record
+
+@contextmanager
+def rerun_section(section, sink=None, fragment_run=False):
+    """Time section and tally its payload under its own view; when no script
+    rerun is in progress (fragment_run: this is a fragment-only rerun), it is
+    recorded as a rerun of its own."""
+    own = not in_rerun() or (fragment_run and _run.kind == "script")
+    if own:
+        begin_rerun(kind="fragment", sink=sink)
+    outer, _run.view = _run.view, section
+    try:
+        with timed(section):
+            yield
+    finally:
+        _run.view = outer
+        if own:
+            end_rerun(fragment=section)
+
+# ─── PAYLOAD ────────────────────────────────────────────────────────
+def tally(name, n=1):
+    """Add n to counter name (html_bytes, cards, ...) for the current view."""
+    payload = getattr(_run, "payload", None)
+    if payload is not None:
+        counts = payload.setdefault(_run.view, {})
+        counts[name] = counts.get(name, 0) + n
+
+def merge_payload(totals, payload):
+    """Fold one rerun's {view: {name: n}} into totals {view: {name: [reruns, sum, max]}}."""
+    for view, counts in payload.items():
+        into = totals.setdefault(view, {})
+        for name, n in counts.items():
+            t = into.get(name)
+            if t is None:
+                into[name] = [1, n, n]
+            else:
+                t[0] += 1
+                t[1] += n
+                t[2] = max(t[2], n)
+
+def payload_report(totals=None):
+    """Rows of (view, name, reruns, mean per rerun, max per rerun, total), largest first;
+    process-wide unless a session's totals are given."""
+    if totals is None:
+        with _lock:
+            totals = {v: {k: list(t) for k, t in c.items()} for v, c in _payload.items()}
+    rows = [(view, name, runs, total / runs, peak, total)
+            for view, counts in totals.items() for name, (runs, total, peak) in counts.items()]
+    return sorted(rows, key=lambda r: (r[1] != "html_bytes", -r[5]))
+
+# ─── EXPORT ─────────────────────────────────────────────────────────
+def snapshot():
+    """{section: Histogram copy}, for display."""
+    with _lock:
+        out = {}
+        for name, h in _histograms.items():
+            c = out[name] = Histogram()
+            c.counts, c.count, c.sum, c.max = list(h.counts), h.count, h.sum, h.max
+        return out
+
+def recent_reruns():
+    with _lock:
+        return list(_recent)
+
+def prometheus_text():
+    lines = ["# HELP thunderbird_section_seconds Wall time per app section per rerun.",
+             "# TYPE thunderbird_section_seconds histogram"]
+    for name, h in sorted(snapshot().items()):
+        cumulative = 0
+        for bound, n in zip(BUCKETS + ("+Inf",), h.counts):
+            cumulative += n
+            lines.append(f'thunderbird_section_seconds_bucket{{section="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'thunderbird_section_seconds_sum{{section="{name}"}} {h.sum:.6f}')
+        lines.append(f'thunderbird_section_seconds_count{{section="{name}"}} {h.count}')
+    report = payload_report()
+    lines += ["# HELP thunderbird_payload_total HTML bytes and element counts sent per view.",
+              "# TYPE thunderbird_payload_total counter"]
+    lines += [f'thunderbird_payload_total{{view="{v}",name="{n}"}} {t}' for v, n, _, _, _, t in report]
+    lines += ["# HELP thunderbird_payload_max Largest single-rerun value per view.",
+              "# TYPE thunderbird_payload_max gauge"]
+    lines += [f'thunderbird_payload_max{{view="{v}",name="{n}"}} {m}' for v, n, _, _, m, _ in report]
+    return "\n".join(lines) + "\n"
+
+def export(record=None, directory=None, force=False):
+    """Append record to reruns.jsonl and refresh timings.prom (rate-limited unless force).
+
+    Called from end_rerun() on the user's rerun, so I/O errors are logged, never raised.
+    """
+    global _last_export
+    directory = directory or METRICS_DIR
+    tmp = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        if record is not None:
+            with _lock, open(os.path.join(directory, "reruns.jsonl"), "a") as f:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        now = time.monotonic()
+        with _lock:
+            due = force or now - _last_export >= EXPORT_INTERVAL
+            if due:
+                _last_export = now
+        if due:
+            # Each writer gets its own temp file, so concurrent refreshes never
+            # interleave; whichever os.replace() lands last wins, whole.
+            with tempfile.NamedTemporaryFile("w", dir=directory, prefix=".timings.", suffix=".tmp",
+                                             delete=False) as f:
+                tmp = f.name
+                f.write(prometheus_text())
+            os.chmod(tmp, 0o644)  # mkstemp makes it owner-only; the textfile collector must read it
+            os.replace(tmp, os.path.join(directory, "timings.prom"))
+    except OSError as e:
+        log.warning("metrics export to %s failed: %s", directory, e)
+        if tmp is not None and os.path.exists(tmp):
+            os.unlink(tmp)
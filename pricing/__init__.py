@@ -0,0 +1,19 @@
+"""Thunderbird Hub pricing logic, importable without Streamlit.
+
+Scalar helpers live in pricing.core and are re-exported here; importing the
+package pulls in nothing beyond the standard library, so scripts and workers
+load it in well under a millisecond. Nothing in this package may import
+Streamlit or pandas. The NumPy batch engine is in pricing.batch and is only
+imported when asked for.
+"""
+from pricing.core import (
+    ru, waste_std, waste_low, low_cost_val, pidx, gp, fin_price, per_sq, ladder_cents,
+    cost_large, price_rows,
+    low_slope_large, addon_cost, full_roof_cost, cost_small_product, deck_info,
+    repair_cost, repair_rows,
+    tier_rate, tier_rates, rate_at,
+    RATES, TIERS, LARGE_GPMS, SMALL_GPMS, FIN_BASE, SMALL_PRODUCTS, SMALL_HDZ_TIERS,
+    MATERIALS, LABOR, REPAIR_GPMS,
+    MIN_PITCH, MAX_LOW_PITCH, MAX_INPUT,
+    PRODUCTS, MAX_TIERS, MAX_PITCH, PRODUCT_CODE, TIER_CODE, PITCH_BUCKET, PITCH_BUCKET_LABELS, RATE_GRID,
+)
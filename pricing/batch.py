@@ -0,0 +1,143 @@
+"""Vectorized full-roof pricing — prices whole arrays of roofs in one call.
+
+Mirrors waste_std / cost_large / price_rows exactly — prices come from the
+same integer-cents kernel — so a batch run matches what the Full Roof tab
+shows for the same inputs.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from pricing.cents import to_cents, gp_cents, fin_cents
+from pricing.core import (
+    ladder_cents, TIERS, LARGE_GPMS,
+    PRODUCTS, MAX_TIERS, MAX_PITCH, PRODUCT_CODE, TIER_CODE, PITCH_BUCKET, PITCH_BUCKET_LABELS, RATE_GRID,
+)
+
+# ─── DENSE RATE GRIDS ───────────────────────────────────────────────
+# The compiled RATE_GRID as (product, tier, pitch bucket) arrays, NaN where a
+# product does not offer a tier. _SLOT_GRID follows each product's TIERS
+# order; _NAME_GRID is indexed by tier name so an explicit tier can be looked
+# up for any product.
+TIER_NAMES = list(dict.fromkeys(t for p in PRODUCTS for t in TIERS[p]))
+
+_TIER_NAME_CODE = {t: i for i, t in enumerate(TIER_NAMES)}
+_PITCH_BUCKET   = np.array(PITCH_BUCKET, dtype=np.intp)
+_SLOT_GRID      = np.full((len(PRODUCTS), MAX_TIERS, 3), np.nan)
+_NAME_GRID      = np.full((len(PRODUCTS), len(TIER_NAMES), 3), np.nan)
+_grid = np.asarray(RATE_GRID, dtype=float).reshape(_SLOT_GRID.shape)
+for _p, _i in PRODUCT_CODE.items():
+    for _t, _j in TIER_CODE[_p].items():
+        _SLOT_GRID[_i, _j] = _NAME_GRID[_i, _TIER_NAME_CODE[_t]] = _grid[_i, _j]
+
+def _codes(names, table):
+    """Map a scalar or array of names to integer codes (KeyError if unknown)."""
+    names = np.asarray(names)
+    uniq, inv = np.unique(names, return_inverse=True)
+    return np.array([table[u] for u in uniq.tolist()], dtype=np.intp)[inv].reshape(names.shape)
+
+# ─── KERNELS ────────────────────────────────────────────────────────
+def waste_std_batch(sq, facets):
+    sq, facets = np.asarray(sq, dtype=float), np.asarray(facets)
+    m = np.select(
+        [facets < 5, facets < 7, facets <= 20, facets <= 35],
+        [1.12, 1.15, 1.17, 1.20],
+        1.25,
+    )
+    return np.ceil(sq * m).astype(np.int64)
+
+def pidx_batch(pitch):
+    p = np.asarray(pitch)
+    if p.dtype.kind in "iu" and p.size and 0 <= p.min() and p.max() <= MAX_PITCH:
+        return _PITCH_BUCKET[p]
+    return np.where((p >= 4) & (p <= 7), 0, np.where((p >= 8) & (p <= 10), 1, 2))
+
+def price_ladder(cost, gpm_list=LARGE_GPMS, custom_gpm=None):
+    """Sale prices for every row of gpm_list, in price_rows order, on a new last axis.
+
+    With custom_gpm, two columns are appended: the custom price and its financing price.
+    Runs the same integer-cents ladder as price_rows; NaN costs give NaN prices.
+    """
+    cost = np.asarray(cost, dtype=float)
+    missing = np.isnan(cost)
+    cols = ladder_cents(to_cents(np.where(missing, 0, cost)), gpm_list, custom_gpm)
+    prices = np.stack(cols, axis=-1) / 100
+    prices[missing] = np.nan
+    return prices
+
+# ─── GPM CURVE ──────────────────────────────────────────────────────
+# Every step of the Custom GPM sliders: 0.01 .. 0.99
+GPM_STEPS = np.arange(1, 100) / 100
+_STEP_BP  = np.arange(100, 10000, 100)
+
+def gpm_curve(cost):
+    """Price and financing price at every GPM_STEPS margin, in one pass.
+
+    Returns (price, fin): cost's shape with a trailing GPM_STEPS axis. price is
+    what gp() gives, fin what the "Custom GPM + Financing" row shows.
+    """
+    c = to_cents(np.asarray(cost, dtype=float))[..., None]
+    price = gp_cents(c, _STEP_BP)
+    return price // 100, fin_cents(price) / 100
+
+@lru_cache(maxsize=256)
+def gpm_curve_table(costs):
+    """gpm_curve for a tuple of tier costs, cached and read-only, for the UI."""
+    price, fin = gpm_curve(costs)
+    price.flags.writeable = fin.flags.writeable = False
+    return price, fin
+
+# ─── SCENARIO MATRIX ────────────────────────────────────────────────
+def scenario_matrix(std_tsq, low_tsq=0, low_lc=0, low_shingled=False, addons=0, gpm_list=LARGE_GPMS):
+    """One roof priced as every product x tier slot x pitch bucket, as full_roof_cost does.
+
+    Returns (cost, prices): cost is (len(PRODUCTS), MAX_TIERS, 3), NaN for tier
+    slots a product does not offer; prices adds a trailing price_ladder axis.
+    """
+    lc = (_SLOT_GRID + 47) * low_tsq if (low_shingled and low_tsq > 0) else low_lc
+    cost = std_tsq * _SLOT_GRID + lc + addons
+    return cost, price_ladder(cost, gpm_list)
+
+def scenario_pivot(cost, prices, by="pitch", level=None, bucket=0, gpm_list=LARGE_GPMS):
+    """Flatten a scenario_matrix into table columns, one row per product tier.
+
+    by="pitch": a column per pitch bucket showing level (a gpm_list label, or
+    None for cost). by="gpm": a column per GPM level at the given pitch bucket.
+    """
+    labels = [label for _, label, _ in gpm_list]
+    if by == "pitch":
+        cols = PITCH_BUCKET_LABELS
+        grid = cost if level is None else prices[..., labels.index(level)]
+    else:
+        cols = ["Cost"] + labels
+        grid = np.concatenate([cost[..., bucket, None], prices[..., bucket, :]], axis=-1)
+    table = {"Product": [], "Tier": [], **{c: [] for c in cols}}
+    for p, i in PRODUCT_CODE.items():
+        for t, j in TIER_CODE[p].items():
+            table["Product"].append(p)
+            table["Tier"].append(t)
+            for c, v in zip(cols, grid[i, j].tolist()):
+                table[c].append(v)
+    return table
+
+def price_full_roofs(sq, facets, pitch, product, tier=None, lc=0, gpm_list=LARGE_GPMS, custom_gpm=None):
+    """Price many full roofs at once. Every argument broadcasts against the others.
+
+    Returns (std_tsq, cost, prices):
+      std_tsq — waste-adjusted SQ per roof
+      cost    — (n,) for the given tier, or (n, MAX_TIERS) for every tier slot of
+                each roof's product (TIERS order), NaN where a product has fewer tiers
+      prices  — cost with a trailing price_ladder axis
+    """
+    std_tsq = waste_std_batch(sq, facets)
+    b = pidx_batch(pitch)
+    p = _codes(product, PRODUCT_CODE)
+    if tier is None:
+        rate = _SLOT_GRID[p[..., None], np.arange(MAX_TIERS), b[..., None]]
+        cost = std_tsq[..., None] * rate + np.asarray(lc, dtype=float)[..., None]
+    else:
+        rate = _NAME_GRID[p, _codes(tier, _TIER_NAME_CODE), b]
+        if np.isnan(rate).any():
+            raise KeyError("tier not offered for product")
+        cost = std_tsq * rate + lc
+    return std_tsq, cost, price_ladder(cost, gpm_list, custom_gpm)
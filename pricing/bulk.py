@@ -0,0 +1,144 @@
+"""Headless bulk quoting over CSV measurement exports.
+
+    python -m pricing.bulk measurements.csv priced.csv
+
+Rows are read, priced and written one at a time, so memory stays flat no
+matter how large the export is. Each roof goes through the same logic as the
+Full Roof tab (20+ adj. SQ) or the Small Job tab (under 20), and produces one
+output row per tier.
+
+Input columns (only std_sq is required):
+    job_id, client, std_sq, facets, pitch,
+    low_sq, low_facets, low_pitch, low_material (Roll Roofing / Shingled),
+    product (full roof), small_product (small job),
+    extra_layers, permit, counter_flash_ft, referral, custom_gpm
+Add-ons only apply to full roofs, as in the tabs. A row with a value that is
+not a number or out of range (pitch 4-13, low_pitch 1-3, custom_gpm between
+0 and 1, nothing negative) gets a "bad input" note instead of prices.
+"""
+import argparse
+import csv
+import sys
+
+from pricing.core import (
+    waste_std, waste_low, low_cost_val, price_rows,
+    low_slope_large, addon_cost, full_roof_cost, cost_small_product,
+    TIERS, LARGE_GPMS, SMALL_GPMS, SMALL_PRODUCTS, SMALL_HDZ_TIERS,
+    MIN_PITCH, MAX_PITCH, MAX_LOW_PITCH, MAX_INPUT,
+)
+
+LEVELS = list(dict.fromkeys(label for _, label, _ in LARGE_GPMS + SMALL_GPMS))
+CUSTOM_LEVELS = ["Custom GPM", "Custom GPM + Financing"]
+COLUMNS = ["job_id", "client", "job_type", "product", "tier", "adj_sq", "cost"] + LEVELS + CUSTOM_LEVELS + ["note"]
+
+def _num(row, key, default=0, cast=float, lo=0, hi=MAX_INPUT):
+    v = (row.get(key) or "").strip()
+    if not v:
+        return default
+    try:
+        n = float(v)
+    except ValueError:
+        raise ValueError(f"{key} must be a number") from None
+    if not lo <= n <= hi:  # also catches nan and inf
+        raise ValueError(f"{key} must be between {lo} and {hi}")
+    if cast is int and not n.is_integer():
+        raise ValueError(f"{key} must be a whole number")
+    return cast(n)
+
+def _flag(row, key):
+    return (row.get(key) or "").strip().lower() in ("1", "y", "yes", "true", "x")
+
+def _fmt(v):
+    if v is None:           return ""
+    if isinstance(v, float): return f"{v:.2f}"
+    return str(v)
+
+def _priced(base, tier, cost, gpm_list, custom_gpm):
+    out = dict(base, tier=tier, cost=_fmt(cost))
+    rows = price_rows(cost, gpm_list, custom_gpm)
+    for label, _, p, _ in rows[:len(gpm_list)]:
+        out[label] = _fmt(p)
+    for label, (_, _, p, _) in zip(CUSTOM_LEVELS, rows[len(gpm_list):]):
+        out[label] = _fmt(p)
+    return out
+
+def quote_row(row):
+    """Yield one priced output dict per tier for a single measurement row."""
+    base = {"job_id": row.get("job_id", ""), "client": row.get("client", "")}
+    try:
+        std_sq     = _num(row, "std_sq")
+        facets     = _num(row, "facets", cast=int)
+        pitch      = _num(row, "pitch", 8, int, MIN_PITCH, MAX_PITCH)
+        lsq        = _num(row, "low_sq")
+        lfac       = _num(row, "low_facets", cast=int)
+        lpitch     = _num(row, "low_pitch", 1, int, 1, MAX_LOW_PITCH)
+        layers     = _num(row, "extra_layers", cast=int)
+        cf_feet    = _num(row, "counter_flash_ft", cast=int)
+        custom_gpm = _num(row, "custom_gpm", None)
+    except ValueError as e:
+        yield dict(base, note=f"bad input: {e}")
+        return
+    if custom_gpm is not None and not 0 < custom_gpm < 1:
+        yield dict(base, note="bad input: custom_gpm must be between 0 and 1")
+        return
+    if std_sq <= 0:
+        yield dict(base, note="no standard slope measurement")
+        return
+
+    std_tsq = waste_std(std_sq, facets)
+    material = "Shingled" if (row.get("low_material") or "").strip().lower() == "shingled" else "Roll Roofing"
+    low_tsq, low_lc, low_shingled = low_slope_large(lsq, lfac, lpitch, material)
+
+    if std_tsq + low_tsq >= 20:
+        product = (row.get("product") or "").strip() or "HDZ"
+        if product not in TIERS:
+            yield dict(base, job_type="full", product=product, note="unknown product")
+            return
+        addons = addon_cost(std_tsq, layers, _flag(row, "permit"), cf_feet, _flag(row, "referral"))
+        base.update(job_type="full", product=product, adj_sq=std_tsq + low_tsq)
+        for tier in TIERS[product]:
+            c = full_roof_cost(std_tsq, pitch, product, tier, low_tsq, low_lc, low_shingled, addons)
+            yield _priced(base, tier, c, LARGE_GPMS, custom_gpm)
+        return
+
+    product = (row.get("small_product") or "").strip() or "HDZ"
+    if product not in SMALL_PRODUCTS:
+        yield dict(base, job_type="small", product=product, note="unknown product")
+        return
+    s_low_tsq = waste_low(lsq, lfac, lpitch) if lsq > 0 else 0
+    s_low_lc  = low_cost_val(s_low_tsq, lpitch) if lsq > 0 else 0
+    total_tsq = std_tsq + s_low_tsq
+    base.update(job_type="small", product=product, adj_sq=total_tsq)
+    tiers = SMALL_HDZ_TIERS if product == "HDZ" else [None]
+    for tier in tiers:
+        base_cost = cost_small_product(total_tsq, product, tier)
+        if base_cost is None:
+            yield dict(base, tier=tier or "", note="out of range for small job (must be 1-19 SQ)")
+            continue
+        yield _priced(base, tier or "", base_cost + s_low_lc, SMALL_GPMS, custom_gpm)
+
+def quote_csv(src, dst):
+    """Stream measurement rows from src to priced rows in dst. Returns input rows read."""
+    writer = csv.DictWriter(dst, fieldnames=COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    n = 0
+    for n, row in enumerate(csv.DictReader(src), 1):
+        writer.writerows(quote_row(row))
+    return n
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m pricing.bulk", description="Price a CSV of roof measurements.")
+    ap.add_argument("input",  help="measurement CSV, or - for stdin")
+    ap.add_argument("output", help="priced CSV, or - for stdout")
+    args = ap.parse_args(argv)
+    src = sys.stdin if args.input == "-" else open(args.input, newline="")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    try:
+        n = quote_csv(src, dst)
+    finally:
+        if src is not sys.stdin:  src.close()
+        if dst is not sys.stdout: dst.close()
+    print(f"priced {n} rows", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
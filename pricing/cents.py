@@ -0,0 +1,47 @@
+"""Integer-cents pricing kernel.
+
+Money is held as integer cents and margins as integer basis points, so margin,
+financing and per-SQ arithmetic is exact — no float division landing a hair
+above a whole dollar and ceil-ing up an extra $1. Against that float math,
+gp() comes out $1 lower for about 3.6% of whole-dollar cost / slider-margin
+pairs (0.7% at the fixed ladder GPMs, ~1% for costs with cents) and is never
+higher; financing rows rounded at x.5 can show $1 less about 0.04% of the
+time. tests/test_cents.py pins it to exact Fraction math.
+
+Everything here uses only +, *, // and round, so the same functions take
+Python ints or NumPy integer arrays: the tabs and the batch engine run
+literally the same arithmetic.
+"""
+
+FIN_BP = 10700  # financing adds 7%
+
+def _round(v):
+    # NumPy arrays and scalars round half-to-even, as Python's round() does
+    return v.round().astype("int64") if hasattr(v, "round") else round(v)
+
+def to_cents(dollars):
+    return _round(dollars * 100)
+
+def bp(m):
+    """GPM fraction (0.35) -> basis points (3500)."""
+    return _round(m * 10000)
+
+def ceil_div(a, b):
+    return -(-a // b)
+
+def round_div(a, b):
+    """a / b rounded half to even (b > 0), the same rule '{:,.0f}' formatting uses."""
+    q, r = a // b, a % b
+    return q + ((2 * r > b) | ((2 * r == b) & (q % 2 == 1)))
+
+def gp_cents(cost_c, m_bp):
+    """Sale price at margin m_bp, rounded up to a whole dollar, in cents."""
+    return ceil_div(cost_c * 100, 10000 - m_bp) * 100
+
+def fin_cents(price_c):
+    """Financing price to the cent."""
+    return round_div(price_c * FIN_BP, 10000)
+
+def fin_up_cents(price_c):
+    """Financing price rounded up to a whole dollar, in cents."""
+    return ceil_div(price_c * FIN_BP, 1000000) * 100
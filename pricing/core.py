@@ -0,0 +1,292 @@
+import math
+
+from pricing.cents import to_cents, bp, round_div, gp_cents, fin_cents, fin_up_cents
+
+# ─── HELPERS ────────────────────────────────────────────────────────
+def ru(v):
+    return math.ceil(v)
+
+def waste_std(sq, facets):
+    if facets < 5:      m = 1.12
+    elif facets < 7:    m = 1.15
+    elif facets <= 20:  m = 1.17
+    elif facets <= 35:  m = 1.20
+    else:               m = 1.25
+    return ru(sq * m)
+
+def waste_low(sq, facets, pitch):
+    if pitch == 2:
+        if facets < 5:     m = 1.17
+        elif facets < 7:   m = 1.20
+        elif facets <= 20: m = 1.22
+        elif facets <= 35: m = 1.25
+        else:              m = 1.30
+    else:
+        if facets < 5:     m = 1.12
+        elif facets < 7:   m = 1.15
+        elif facets <= 20: m = 1.17
+        elif facets <= 35: m = 1.20
+        else:              m = 1.25
+    return ru(sq * m)
+
+def low_cost_val(tsq, pitch):
+    return tsq * {1: 375, 2: 370, 3: 350}[pitch]
+
+def pidx(p):
+    if 4 <= p <= 7:    return 0
+    elif 8 <= p <= 10: return 1
+    else:              return 2
+
+RATES = {
+    "HDZ":                {"Signature":[296,301,307],"Gold":[335,340,346],"Silver":[320,324,330],"Bronze":[305,311,316]},
+    "UHDZ":               {"Signature":[317,322,328],"Gold":[356,361,367],"Silver":[341,345,351],"Bronze":[326,332,337]},
+    "CAM II / Slateline": {"Signature":[481,486,492],"Gold":[520,525,531],"Silver":[505,509,515],"Bronze":[490,496,501]},
+    "CT Landmark":        {"3-Star Land":[307,311,317],"3-Star Pro":[311,315,321],"4-Star Land":[322,327,333],"4-Star Pro":[326,331,337]},
+    "OC / RS / Prud":     {"OC Dur":[301,306,312],"Royal Sov":[283,288,294],"Prud":[345,350,360]},
+}
+
+TIERS = {
+    "HDZ":                ["Signature","Gold","Silver","Bronze"],
+    "UHDZ":               ["Signature","Gold","Silver","Bronze"],
+    "CAM II / Slateline": ["Signature","Gold","Silver","Bronze"],
+    "CT Landmark":        ["3-Star Land","3-Star Pro","4-Star Land","4-Star Pro"],
+    "OC / RS / Prud":     ["OC Dur","Royal Sov","Prud"],
+}
+
+# Input bounds for the headless entry points (bulk CSV, pricing service), as
+# the tabs' widgets enforce them: standard slope 4/12-13/12, low slope
+# 1/12-3/12. MAX_INPUT caps SQ, facets, layers and feet far above any real
+# roof, so prices stay well inside float range.
+MIN_PITCH     = 4
+MAX_LOW_PITCH = 3
+MAX_INPUT     = 10_000
+
+# ─── COMPILED RATE TABLE ────────────────────────────────────────────
+# RATES flattened once at import into a dense list indexed by integer codes:
+#   RATE_GRID[(PRODUCT_CODE[product] * MAX_TIERS + TIER_CODE[product][tier]) * 3 + bucket]
+# PITCH_BUCKET maps each whole pitch 0-13 to its pidx bucket.
+PRODUCTS     = list(RATES)
+MAX_TIERS    = max(len(t) for t in TIERS.values())
+MAX_PITCH    = 13
+PRODUCT_CODE = {p: i for i, p in enumerate(PRODUCTS)}
+TIER_CODE    = {p: {t: j for j, t in enumerate(TIERS[p])} for p in PRODUCTS}
+PITCH_BUCKET = [pidx(p) for p in range(MAX_PITCH + 1)]
+PITCH_BUCKET_LABELS = ["Pitch 4-7", "Pitch 8-10", "Pitch 11+"]
+RATE_GRID    = [0] * (len(PRODUCTS) * MAX_TIERS * 3)
+for _p, _i in PRODUCT_CODE.items():
+    for _t, _j in TIER_CODE[_p].items():
+        _o = (_i * MAX_TIERS + _j) * 3
+        RATE_GRID[_o:_o + 3] = RATES[_p][_t]
+
+def rate_at(pc, tc, pitch):
+    """Per-SQ rate by integer product/tier codes."""
+    b = PITCH_BUCKET[pitch] if pitch.__class__ is int and 0 <= pitch <= MAX_PITCH else pidx(pitch)
+    return RATE_GRID[(pc * MAX_TIERS + tc) * 3 + b]
+
+def tier_rate(product, tier, pitch):
+    return rate_at(PRODUCT_CODE[product], TIER_CODE[product][tier], pitch)
+
+def tier_rates(product, tier):
+    """All three pitch-bucket rates for a product tier."""
+    o = (PRODUCT_CODE[product] * MAX_TIERS + TIER_CODE[product][tier]) * 3
+    return RATE_GRID[o:o + 3]
+
+LARGE_GPMS = [
+    (0.39, "39% GPM",   False),
+    (0.37, "37% GPM",   False),
+    ("fin35", "Financing (35% base)", True),
+    (0.35, "35% GPM",   False),
+    (0.32, "32% GPM",   False),
+    (0.26, "26% GPM",   False),
+    ("fin18", "Lowest Financing (18% base)", True),
+    (0.18, "18% GPM",   False),
+]
+
+SMALL_GPMS = [
+    (0.60, "60% GPM",   False),
+    (0.50, "50% GPM",   False),
+    ("fin40", "Financing (40% base)", True),
+    (0.40, "40% GPM",   False),
+    (0.35, "35% GPM",   False),
+    (0.30, "30% GPM",   False),
+    ("fin20", "Lowest Financing (20% base)", True),
+    (0.20, "20% GPM",   False),
+]
+
+# Financing rows are priced off this GPM row, marked up 7%
+FIN_BASE = {"fin35": 0.35, "fin18": 0.18, "fin40": 0.40, "fin20": 0.20}
+
+# Margin, financing and per-SQ math goes through the integer-cents kernel
+def gp(cost, m):
+    return gp_cents(to_cents(cost), bp(m)) // 100
+
+def fin_price(price):
+    """Financing price rounded up to a whole dollar."""
+    return fin_up_cents(to_cents(price)) // 100
+
+def per_sq(amount, tsq):
+    """Whole dollars per SQ."""
+    return round_div(to_cents(amount), tsq * 100)
+
+def ladder_cents(cost_c, gpm_list, custom_gpm=None):
+    """Prices in cents for every row of gpm_list (plus custom GPM and its financing).
+
+    Works on int cents or NumPy int64 arrays of cents alike.
+    """
+    pa = {m: gp_cents(cost_c, bp(m)) for m, _, _ in gpm_list if isinstance(m, float)}
+    out = [fin_cents(pa[FIN_BASE[m]]) if m in FIN_BASE else pa[m] for m, _, _ in gpm_list]
+    if custom_gpm:
+        cp = gp_cents(cost_c, bp(custom_gpm))
+        out += [cp, fin_cents(cp)]
+    return out
+
+def cost_large(std_tsq, pitch, product, tier, lc=0):
+    return std_tsq * tier_rate(product, tier, pitch) + lc
+
+def price_rows(cost, gpm_list, custom_gpm=None):
+    # GPM rows are whole dollars; financing rows keep their cents
+    vals = ladder_cents(to_cents(cost), gpm_list, custom_gpm)
+    rows = []
+    for (m, label, is_fin), v in zip(gpm_list, vals):
+        p = v / 100 if m in FIN_BASE else v // 100
+        rows.append((label, f"{int(m*100)}%" if isinstance(m, float) else "—", p, is_fin))
+    if custom_gpm:
+        rows.append((f"Custom {int(custom_gpm*100)}% GPM", f"{int(custom_gpm*100)}%", vals[-2] // 100, False))
+        rows.append(("Custom GPM + Financing", "—", vals[-1] / 100, True))
+    return rows
+
+# ─── FULL ROOF JOB ──────────────────────────────────────────────────
+def low_slope_large(lsq, lfac, lpitch, material="Roll Roofing"):
+    """Low slope section on a full roof -> (low_tsq, low_lc, shingled).
+
+    Roll roofing is a flat $375/adj. SQ. Shingled (2/12 and 3/12 only) takes 5%
+    waste, rounded up only if > 0.15 above a whole number; its cost depends on
+    the tier, so low_lc is 0 and full_roof_cost adds (tier rate + $47) per SQ.
+    """
+    if lsq <= 0:
+        return 0, 0, False
+    if lpitch not in (2, 3) or material != "Shingled":
+        low_tsq = waste_low(lsq, lfac, lpitch)
+        return low_tsq, low_tsq * 375, False
+    raw = lsq * 1.05
+    whole = math.floor(raw)
+    low_tsq = whole + 1 if (raw - whole) > 0.15 else whole
+    return max(low_tsq, 1), 0, True
+
+def addon_cost(std_tsq, extra_layers=0, permit=False, cf_feet=0, referral=False):
+    """Extra layer removal ($25/layer/SQ), permit ($300), counter flashing ($10/ft), referral ($500)."""
+    return (extra_layers * std_tsq * 25 + (300 if permit else 0)
+            + cf_feet * 10 + (500 if referral else 0))
+
+def full_roof_cost(std_tsq, pitch, product, tier, low_tsq=0, low_lc=0, low_shingled=False, addons=0):
+    if low_shingled and low_tsq > 0:
+        # Shingled low slope: charge (tier_rate_per_sq + $47) * low_tsq
+        low_lc = (tier_rate(product, tier, pitch) + 47) * low_tsq
+    return cost_large(std_tsq, pitch, product, tier, lc=low_lc) + addons
+
+# ─── SMALL JOB ──────────────────────────────────────────────────────
+SMALL_PRODUCTS = ["HDZ", "Royal Sovereign", "CT Landmark 3-Star", "CT Landmark Pro 3-Star"]
+SMALL_HDZ_TIERS = ["Signature", "Gold", "Silver", "Bronze"]
+
+def cost_small_product(total_tsq, product, tier):
+    """Returns cost for small job by product. tier is only used for HDZ."""
+    hdz_hi = {"Signature": 335, "Gold": 365, "Silver": 355, "Bronze": 345}
+
+    if product == "HDZ":
+        hi = hdz_hi[tier]
+        if total_tsq == 1:          return 500
+        if total_tsq == 2:          return 800
+        if 3 <= total_tsq <= 9:     return total_tsq * 350
+        if 10 <= total_tsq <= 19:   return total_tsq * hi
+        return None
+
+    # HDZ base rates used as reference
+    hdz_1sq  = 500
+    hdz_2sq  = 800
+    hdz_1_9  = 350   # per SQ rate for 3-9 SQ
+    hdz_sig_hi = 335  # Signature 10-20 rate
+
+    if product == "Royal Sovereign":
+        if total_tsq == 1:          return hdz_1sq - 13
+        if total_tsq == 2:          return hdz_2sq - (13 * 2)
+        if 3 <= total_tsq <= 9:     return total_tsq * (hdz_1_9 - 13)
+        if 10 <= total_tsq <= 19:   return total_tsq * 322
+        return None
+
+    if product == "CT Landmark 3-Star":
+        if total_tsq == 1:          return hdz_1sq
+        if total_tsq == 2:          return hdz_2sq
+        if 3 <= total_tsq <= 9:     return total_tsq * hdz_1_9
+        if 10 <= total_tsq <= 19:   return total_tsq * hdz_sig_hi  # Signature price
+        return None
+
+    if product == "CT Landmark Pro 3-Star":
+        if total_tsq == 1:          return hdz_1sq + 8
+        if total_tsq == 2:          return hdz_2sq + (8 * 2)
+        if 3 <= total_tsq <= 9:     return total_tsq * (hdz_1_9 + 8)
+        if 10 <= total_tsq <= 19:   return total_tsq * (hdz_sig_hi + 8)
+        return None
+
+    return None
+
+# ─── DECK OVER ──────────────────────────────────────────────────────
+def deck_info(total_tsq, gpm=0.33):
+    sheets = ru((total_tsq * 100) / 32)
+    cost   = sheets * 35
+    price  = gp(cost, gpm)
+    return sheets, cost, price
+
+# ─── REPAIR ─────────────────────────────────────────────────────────
+MATERIALS = [
+    ("1x6's",                          11, "12 ft board"),
+    ("3-in-1 Sewer Pipe Flashing",      7, "each"),
+    ("3-in Sewer Pipe Collar",          7, "each"),
+    ("3x3 Edge Metal (Rolled Roofing)", 10, "10' piece"),
+    ("3-Tab Shingles",                  32, "bundle"),
+    ("Architectural Shingles",          37, "bundle"),
+    ("Button Caps",                     27, "bucket"),
+    ("Caulking",                         9, "tube"),
+    ("Coil Nails",                      47, "box"),
+    ("HVAC 6-8in Boot",                 40, "each"),
+    ("HVAC Cap",                        20, "each"),
+    ("Ice & Water Shield",              70, "2-SQ roll"),
+    ("Metal Primer (Rolled Roof)",      50, "quart"),
+    ("Plywood / OSB",                   25, "sheet (32 sqft)"),
+    ("Ridge Cap",                       60, "20 ln ft"),
+    ("Ridge Vent",                      12, "4' piece"),
+    ("Roll Roofing Base Sheet",        140, "2-SQ roll"),
+    ("Roll Roofing Cap Sheet",         140, "1-SQ roll"),
+    ("Spray Paint",                     10, "can"),
+    ("Standard Drip Edge / Apron",      10, "10' piece"),
+    ("Starter Shingles",                60, "120 ln ft"),
+    ("Step Flashing",                   65, "box of 100"),
+    ("Synthetic Felt",                  95, "10-SQ roll"),
+    ("Trim Coil (Counter Flashing)",   110, "24x50' roll"),
+]
+
+LABOR = [
+    ("Under 2 Hours",        250, "Under 2 hrs work, $99 or less in materials"),
+    ("2 Hours",              400, "$100-$200 materials, 2-3 hrs work"),
+    ("3-6 Hours (Half Day)", 750, "1+ sheet decking, 3-6 bundles, 2-story 8/12+"),
+    ("7+ Hours (Full Day)", 1100, "Any job taking more than 6 hours"),
+]
+
+REPAIR_GPMS = [0.40, 0.45, 0.50, 0.55, 0.60]
+
+def repair_cost(qtys, labor_idx):
+    """qtys maps material name -> quantity. Returns (materials, labor, total)."""
+    mat_cost = sum(qtys.get(n, 0) * p for n, p, _ in MATERIALS)
+    labor_cost = LABOR[labor_idx][1]
+    return mat_cost, labor_cost, mat_cost + labor_cost
+
+def repair_rows(total_cost, custom_gpm=None):
+    """Repair pricing breakdown as (label, GPM, price, is_fin) rows, custom GPM rows first."""
+    rows = []
+    if custom_gpm:
+        cp = gp(total_cost, custom_gpm)
+        rows.append((f"Custom {int(custom_gpm*100)}% GPM", f"{int(custom_gpm*100)}%", cp, False))
+        rows.append(("Custom GPM + Financing", "—", fin_price(cp), True))
+    for m in REPAIR_GPMS:
+        rows.append((f"{int(m*100)}% GPM", f"{int(m*100)}%", gp(total_cost, m), False))
+    rows.append(("Financing (60% base)", "—", fin_price(gp(total_cost, 0.60)), True))
+    return rows
@@ -0,0 +1,81 @@
+"""Per-job quotes, computed once per distinct input set.
+
+A quote is a tuple of TierQuote — one per tier tab — carrying the cost, the
+price_rows table and the client presentation prices. Quotes are immutable and
+held in a bounded process-wide LRU cache, so every rerun and every session
+quoting the same job shares one computation.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+from pricing.core import (
+    gp, fin_price, price_rows, full_roof_cost, cost_small_product,
+    TIERS, LARGE_GPMS, SMALL_GPMS, SMALL_HDZ_TIERS,
+)
+
+QUOTE_CACHE_SIZE = 1024
+
+# tier — tab label; key — TIER_FEATURES / presentation key; rows — price_rows
+# output (None when the job is out of range); cash, fin — presentation prices
+TierQuote = namedtuple("TierQuote", "tier key cost rows cash fin")
+
+# Small job products other than HDZ present as a single tier
+SMALL_PRODUCT_TIER = {
+    "Royal Sovereign":        "Royal Sov",
+    "CT Landmark 3-Star":     "3-Star Land",
+    "CT Landmark Pro 3-Star": "3-Star Pro",
+}
+
+def _gpm(m):
+    return round(m, 2) if m else None
+
+def _tier_quote(tier, key, cost, gpm_list, pres_margin, financing):
+    if cost is None:
+        return TierQuote(tier, key, None, None, None, None)
+    cash = gp(cost, pres_margin)
+    fin  = fin_price(cash) if financing else None
+    return TierQuote(tier, key, cost, tuple(price_rows(cost, gpm_list)), cash, fin)
+
+def _with_custom(quote, custom_gpm):
+    """Append the custom GPM rows. Kept out of the cached quote so scrubbing
+    the Custom GPM slider never recomputes the cost model."""
+    if not custom_gpm:
+        return quote
+    return tuple(q if q.cost is None else q._replace(rows=q.rows + tuple(price_rows(q.cost, [], custom_gpm)))
+                 for q in quote)
+
+def full_roof_quote(std_tsq, pitch, product, low_tsq=0, low_lc=0, low_shingled=False, addons=0,
+                    custom_gpm=None, pres_margin=0.35, financing=True):
+    quote = _full_roof_quote(int(std_tsq), int(pitch), product, int(low_tsq), low_lc, bool(low_shingled),
+                             addons, round(pres_margin, 2), bool(financing))
+    return _with_custom(quote, _gpm(custom_gpm))
+
+@lru_cache(maxsize=QUOTE_CACHE_SIZE)
+def _full_roof_quote(std_tsq, pitch, product, low_tsq, low_lc, low_shingled, addons, pres_margin, financing):
+    return tuple(
+        _tier_quote(tier, tier,
+                    full_roof_cost(std_tsq, pitch, product, tier, low_tsq, low_lc, low_shingled, addons),
+                    LARGE_GPMS, pres_margin, financing)
+        for tier in TIERS[product]
+    )
+
+def small_job_quote(total_tsq, product, low_lc=0, custom_gpm=None, pres_margin=0.40, financing=True):
+    quote = _small_job_quote(int(total_tsq), product, low_lc, round(pres_margin, 2), bool(financing))
+    return _with_custom(quote, _gpm(custom_gpm))
+
+@lru_cache(maxsize=QUOTE_CACHE_SIZE)
+def _small_job_quote(total_tsq, product, low_lc, pres_margin, financing):
+    if product == "HDZ":
+        tiers = [(t, t, t) for t in SMALL_HDZ_TIERS]
+    else:
+        tiers = [(product, SMALL_PRODUCT_TIER.get(product, product), None)]
+    quote = []
+    for tier, key, cost_tier in tiers:
+        base_cost = cost_small_product(total_tsq, product, cost_tier)
+        cost = None if base_cost is None else base_cost + low_lc
+        quote.append(_tier_quote(tier, key, cost, SMALL_GPMS, pres_margin, financing))
+    return tuple(quote)
+
+def presentation_prices(quote):
+    """{tier key: (cash, fin)} for render_cpo_presentation, skipping out-of-range tiers."""
+    return {q.key: (q.cash, q.fin) for q in quote if q.cost is not None}
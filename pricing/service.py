@@ -0,0 +1,388 @@
+"""Local HTTP pricing service for the CRM and proposal tooling.
+
+    python -m pricing.service                      # serve on 127.0.0.1:8765
+    python -m pricing.service --port 9000 --max-batch 256
+    python -m pricing.service load --requests 5000 --concurrency 64
+
+Endpoints (JSON in, JSON out):
+    POST /quote/full-roof   same fields as the bulk CSV: std_sq, facets, pitch,
+                            low_sq, low_facets, low_pitch, low_material, product,
+                            extra_layers, permit, counter_flash_ft, referral,
+                            custom_gpm, plus pres_margin and financing
+    POST /quote/small-job   std_sq, facets, low_sq, low_facets, low_pitch,
+                            product, custom_gpm, pres_margin, financing
+    POST /quote/repair      materials {name: qty}, labor (label or index), custom_gpm
+    GET  /health            liveness and batching counters
+
+Malformed input answers 400: numbers must be finite and in range (pitch
+4-13, low_pitch 1-3, counts whole, nothing negative), product and labor one
+of the listed options.
+
+Requests arriving together are coalesced: each one is parsed on its
+connection and parked on a shared queue, and a single worker takes whatever
+is queued (up to --max-batch requests, without waiting for more), prices each
+distinct input once and answers every waiting request. Quotes come from
+pricing.quote, so the service and the Streamlit tabs share one LRU cache and
+produce identical numbers. Standard library only.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+from http import HTTPStatus
+
+from pricing.core import (
+    waste_std, waste_low, low_cost_val, low_slope_large, addon_cost,
+    repair_cost, repair_rows,
+    TIERS, SMALL_PRODUCTS, MATERIALS, LABOR, MIN_PITCH, MAX_PITCH, MAX_LOW_PITCH, MAX_INPUT,
+)
+from pricing.quote import full_roof_quote, small_job_quote
+
+HOST, PORT = "127.0.0.1", 8765
+MAX_BATCH = 512
+MAX_BODY = 64 * 1024
+
+class BadRequest(ValueError):
+    """Invalid quote input; reported to the client as 400 (or 422 with status)."""
+    def __init__(self, msg, status=HTTPStatus.BAD_REQUEST):
+        super().__init__(msg)
+        self.status = status
+
+# ─── INPUT PARSING ──────────────────────────────────────────────────
+# Each parser turns a JSON body into a hashable key; the same key always
+# produces the same quote, so duplicates within a batch are priced once.
+def _num(body, key, default=0, cast=float, lo=0, hi=MAX_INPUT):
+    v = body.get(key)
+    if v is None or v == "":
+        return default
+    if isinstance(v, bool):
+        raise BadRequest(f"{key}: expected a number")
+    try:
+        n = float(v)
+    except (TypeError, ValueError, OverflowError):
+        raise BadRequest(f"{key}: expected a number") from None
+    if not lo <= n <= hi:  # also catches NaN and infinities
+        raise BadRequest(f"{key}: must be between {lo} and {hi}")
+    if cast is int and not n.is_integer():
+        raise BadRequest(f"{key}: expected a whole number")
+    return cast(n)
+
+def _flag(body, key):
+    v = body.get(key, False)
+    return v.strip().lower() in ("1", "y", "yes", "true", "x") if isinstance(v, str) else bool(v)
+
+def _gpm(body):
+    m = _num(body, "custom_gpm", None)
+    if m is not None and not 0 < m < 1:
+        raise BadRequest("custom_gpm: must be between 0 and 1")
+    return m
+
+def _product(body, products):
+    product = body.get("product") or "HDZ"
+    if not isinstance(product, str) or product not in products:
+        raise BadRequest(f"product: unknown product {product!r}")
+    return product
+
+def _margin(body, default):
+    m = _num(body, "pres_margin", default)
+    if not 0 < m < 1:
+        raise BadRequest("pres_margin: must be between 0 and 1")
+    return m
+
+def _full_roof_key(body):
+    std_sq = _num(body, "std_sq")
+    if std_sq <= 0:
+        raise BadRequest("std_sq: standard slope measurement required")
+    std_tsq = waste_std(std_sq, _num(body, "facets", cast=int))
+    material = "Shingled" if str(body.get("low_material", "")).strip().lower() == "shingled" else "Roll Roofing"
+    low_tsq, low_lc, low_shingled = low_slope_large(_num(body, "low_sq"), _num(body, "low_facets", cast=int),
+                                                    _num(body, "low_pitch", 1, int, 1, MAX_LOW_PITCH), material)
+    if std_tsq + low_tsq < 20:
+        raise BadRequest("under 20 SQ - use /quote/small-job", HTTPStatus.UNPROCESSABLE_ENTITY)
+    product = _product(body, TIERS)
+    addons = addon_cost(std_tsq, _num(body, "extra_layers", cast=int), _flag(body, "permit"),
+                        _num(body, "counter_flash_ft", cast=int), _flag(body, "referral"))
+    return ("full-roof", std_tsq, _num(body, "pitch", 8, int, MIN_PITCH, MAX_PITCH), product, low_tsq, low_lc, low_shingled, addons,
+            _gpm(body), _margin(body, 0.35), _flag(body, "financing") if "financing" in body else True)
+
+def _small_job_key(body):
+    std_sq = _num(body, "std_sq")
+    if std_sq <= 0:
+        raise BadRequest("std_sq: standard slope measurement required")
+    std_tsq = waste_std(std_sq, _num(body, "facets", cast=int))
+    lsq, lpitch = _num(body, "low_sq"), _num(body, "low_pitch", 1, int, 1, MAX_LOW_PITCH)
+    low_tsq = waste_low(lsq, _num(body, "low_facets", cast=int), lpitch) if lsq > 0 else 0
+    low_lc  = low_cost_val(low_tsq, lpitch) if lsq > 0 else 0
+    if std_tsq + low_tsq >= 20:
+        raise BadRequest("20+ SQ - use /quote/full-roof", HTTPStatus.UNPROCESSABLE_ENTITY)
+    product = _product(body, SMALL_PRODUCTS)
+    return ("small-job", std_tsq + low_tsq, product, low_lc,
+            _gpm(body), _margin(body, 0.40), _flag(body, "financing") if "financing" in body else True)
+
+_MATERIAL_NAMES = {n for n, _, _ in MATERIALS}
+_LABOR_INDEX    = {label: i for i, (label, _, _) in enumerate(LABOR)}
+
+def _labor(body):
+    labor = body.get("labor", 0)
+    idx = _LABOR_INDEX.get(labor) if isinstance(labor, str) else labor
+    if isinstance(idx, bool) or not isinstance(idx, int) or not 0 <= idx < len(LABOR):
+        raise BadRequest("labor: expected a labor option label or index")
+    return idx
+
+def _repair_key(body):
+    qtys = body.get("materials") or {}
+    if not isinstance(qtys, dict):
+        raise BadRequest("materials: expected an object of {name: quantity}")
+    unknown = sorted(set(qtys) - _MATERIAL_NAMES)
+    if unknown:
+        raise BadRequest(f"materials: unknown {', '.join(unknown)}")
+    qtys = tuple(sorted((n, q) for n in qtys if (q := _num(qtys, n, cast=int))))
+    return ("repair", qtys, _labor(body), _gpm(body))
+
+PARSERS = {
+    "/quote/full-roof": _full_roof_key,
+    "/quote/small-job": _small_job_key,
+    "/quote/repair":    _repair_key,
+}
+
+# ─── PRICING ────────────────────────────────────────────────────────
+def _rows(rows):
+    return [{"label": label, "gpm": gpm, "price": price, "financing": is_fin} for label, gpm, price, is_fin in rows]
+
+def _quote_json(quote):
+    return [{"tier": q.tier, "key": q.key, "cost": q.cost, "cash": q.cash, "fin": q.fin,
+             "prices": None if q.rows is None else _rows(q.rows)} for q in quote]
+
+def price_key(key):
+    """The JSON-ready response for one parsed request key."""
+    kind, *args = key
+    if kind == "full-roof":
+        std_tsq, pitch, product, low_tsq, low_lc, low_shingled, addons, custom_gpm, pres_margin, financing = args
+        quote = full_roof_quote(std_tsq, pitch, product, low_tsq, low_lc, low_shingled, addons,
+                                custom_gpm, pres_margin, financing)
+        return {"adj_sq": std_tsq + low_tsq, "std_sq": std_tsq, "low_sq": low_tsq, "product": product,
+                "tiers": _quote_json(quote)}
+    if kind == "small-job":
+        total_tsq, product, low_lc, custom_gpm, pres_margin, financing = args
+        quote = small_job_quote(total_tsq, product, low_lc, custom_gpm, pres_margin, financing)
+        return {"adj_sq": total_tsq, "product": product, "tiers": _quote_json(quote)}
+    qtys, labor_idx, custom_gpm = args
+    mat, labor, total = repair_cost(dict(qtys), labor_idx)
+    return {"materials": mat, "labor": labor, "labor_option": LABOR[labor_idx][0], "total_cost": total,
+            "prices": _rows(repair_rows(total, custom_gpm))}
+
+# ─── MICRO-BATCHING ─────────────────────────────────────────────────
+class Batcher:
+    """Coalesces concurrent quote requests so duplicate inputs are priced once."""
+
+    def __init__(self, max_batch=MAX_BATCH):
+        self.max_batch = max_batch
+        self.queue     = asyncio.Queue()
+        self.batches   = 0
+        self.requests  = 0
+        self.priced    = 0
+        self.largest   = 0
+
+    async def submit(self, key):
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((key, fut))
+        return await fut
+
+    async def run(self):
+        # No waiting for stragglers: pricing is synchronous, so whatever queued
+        # up while the last batch was priced is the next batch.
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            self.flush(batch)
+
+    def flush(self, batch):
+        results = {}
+        for key, fut in batch:
+            if key not in results:
+                try:
+                    results[key] = (price_key(key), None)
+                except Exception as e:  # one bad quote must not fail the batch
+                    results[key] = (None, e)
+            if not fut.done():
+                res, err = results[key]
+                fut.set_exception(err) if err else fut.set_result(res)
+        self.batches  += 1
+        self.requests += len(batch)
+        self.priced   += len(results)
+        self.largest   = max(self.largest, len(batch))
+
+    def stats(self):
+        return {"batches": self.batches, "requests": self.requests, "priced": self.priced,
+                "largest_batch": self.largest, "queued": self.queue.qsize()}
+
+# ─── HTTP ───────────────────────────────────────────────────────────
+# A deliberately small HTTP/1.1 server: JSON bodies with Content-Length,
+# keep-alive by default, no chunked uploads. It only ever listens on the
+# loopback interface unless --host says otherwise.
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode() + body
+
+async def _dispatch(batcher, method, path, body):
+    path = path.split("?", 1)[0]
+    if path == "/health":
+        if method != "GET":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "use GET"}
+        return HTTPStatus.OK, dict(ok=True, **batcher.stats())
+    parse = PARSERS.get(path)
+    if parse is None:
+        return HTTPStatus.NOT_FOUND, {"error": f"no such endpoint {path}"}
+    if method != "POST":
+        return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "use POST"}
+    try:
+        payload = json.loads(body or b"{}")
+        if not isinstance(payload, dict):
+            raise BadRequest("expected a JSON object")
+        return HTTPStatus.OK, await batcher.submit(parse(payload))
+    except json.JSONDecodeError as e:
+        return HTTPStatus.BAD_REQUEST, {"error": f"invalid JSON: {e}"}
+    except BadRequest as e:
+        return e.status, {"error": str(e)}
+    except Exception as e:
+        return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"}
+
+async def _handle(batcher, reader, writer):
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                method, path, version = line.decode("latin-1").split()
+            except ValueError:
+                writer.write(_response(HTTPStatus.BAD_REQUEST, {"error": "bad request line"}, False))
+                break
+            headers = {}
+            while (h := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = h.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            try:
+                length = int(headers.get("content-length") or 0)
+            except ValueError:
+                length = -1
+            if length < 0:
+                writer.write(_response(HTTPStatus.BAD_REQUEST, {"error": "bad Content-Length"}, False))
+                break
+            if length > MAX_BODY:
+                writer.write(_response(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "body too large"}, False))
+                break
+            body = await reader.readexactly(length) if length else b""
+            conn = headers.get("connection", "").lower()
+            keep_alive = conn != "close" if version == "HTTP/1.1" else conn == "keep-alive"
+            status, payload = await _dispatch(batcher, method, path, body)
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(host=HOST, port=PORT, max_batch=MAX_BATCH, ready=None):
+    """Run the service until cancelled. ready, if given, is set once listening."""
+    batcher = Batcher(max_batch)
+    worker = asyncio.create_task(batcher.run())
+    server = await asyncio.start_server(lambda r, w: _handle(batcher, r, w), host, port, backlog=1024)
+    print(f"pricing service on http://{host}:{port} (max batch {max_batch})", file=sys.stderr)
+    if ready is not None:
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        worker.cancel()
+
+# ─── LOCAL CLIENT ───────────────────────────────────────────────────
+def post(path, payload, host=HOST, port=PORT, timeout=10):
+    """POST a JSON quote request; returns (status, decoded JSON)."""
+    req = urllib.request.Request(f"http://{host}:{port}{path}", data=json.dumps(payload).encode(),
+                                 headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            return r.status, json.load(r)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+SAMPLE = {
+    "/quote/full-roof": {"std_sq": 32.5, "facets": 12, "pitch": 7, "product": "HDZ", "permit": True},
+    "/quote/small-job": {"std_sq": 10, "facets": 6, "product": "HDZ"},
+    "/quote/repair":    {"materials": {"Architectural Shingles": 3, "Caulking": 2}, "labor": "2 Hours"},
+}
+
+async def _load(host, port, requests, concurrency):
+    """Fire requests over concurrency keep-alive connections; returns latencies in ms."""
+    paths = list(SAMPLE)
+    latencies = []
+
+    async def client(i):
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for n in range(i, requests, concurrency):
+                path = paths[n % len(paths)]
+                payload = dict(SAMPLE[path])
+                if "std_sq" in payload:
+                    payload["std_sq"] = payload["std_sq"] + n % 5
+                body = json.dumps(payload).encode()
+                t0 = time.perf_counter()
+                writer.write(f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                             f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+                status = (await reader.readline()).split()[1]
+                length = 0
+                while (h := await reader.readline()) != b"\r\n":
+                    if h.lower().startswith(b"content-length:"):
+                        length = int(h.split(b":")[1])
+                await reader.readexactly(length)
+                if status != b"200":
+                    raise RuntimeError(f"{path} returned {status.decode()}")
+                latencies.append((time.perf_counter() - t0) * 1000)
+        finally:
+            writer.close()
+
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    return latencies
+
+def load(host=HOST, port=PORT, requests=5000, concurrency=64):
+    """Drive a running service with the SAMPLE requests and print throughput and latency."""
+    t0 = time.perf_counter()
+    lat = sorted(asyncio.run(_load(host, port, requests, concurrency)))
+    elapsed = time.perf_counter() - t0
+    pct = lambda q: lat[min(len(lat) - 1, int(q * len(lat)))]
+    print(f"{len(lat)} requests in {elapsed:.2f}s — {len(lat) / elapsed:,.0f} req/s, "
+          f"p50 {pct(0.50):.2f} ms, p99 {pct(0.99):.2f} ms")
+    with urllib.request.urlopen(f"http://{host}:{port}/health", timeout=10) as r:
+        print("server:", json.load(r))
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m pricing.service", description="Local HTTP pricing service.")
+    ap.add_argument("command", nargs="?", default="serve", choices=["serve", "load"])
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--max-batch", type=int, default=MAX_BATCH, help="flush at this many requests (default 512)")
+    ap.add_argument("--requests", type=int, default=5000, help="load: total requests (default 5000)")
+    ap.add_argument("--concurrency", type=int, default=64, help="load: parallel connections (default 64)")
+    args = ap.parse_args(argv)
+    if args.command == "load":
+        load(args.host, args.port, args.requests, args.concurrency)
+        return
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_batch))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+(function() {
+    if (window.parent.__thunderbirdActivity) { return; }
+    window.parent.__thunderbirdActivity = true;
+    var lastPing = Date.now();
+    var PING_INTERVAL = 4 * 60 * 1000;
+
+    function onActivity() {
+        var now = Date.now();
+        if (now - lastPing > PING_INTERVAL) {
+            lastPing = now;
+            var el = window.parent.document.querySelector('[data-testid="stApp"]');
+            if (el) { el.dispatchEvent(new Event('mousemove', {bubbles: true})); }
+        }
+    }
+
+    ['mousemove','keydown','mousedown','touchstart','scroll','click'].forEach(function(evt) {
+        window.parent.document.addEventListener(evt, onActivity, {passive: true});
+    });
+})();
@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 from pathlib import Path
 
+from metrics import timed, tally
+
 @st.cache_data
 def load_jobs_data():
     data_path = Path(__file__).parent / "2025_Shingle_Color_Book_Converted_FIXED.xlsx"
@@ -15,7 +17,8 @@ def render_tab6():
     st.header("Installed Jobs Catalogue")
     st.markdown("*Searchable catalog of roofs installed in 2025*")
     
-    df = load_jobs_data()
+    with timed("load_jobs_data"):
+        df = load_jobs_data()
     
     col1, col2 = st.columns([1, 3])
     
@@ -62,25 +65,27 @@ def render_tab6():
             key="zip_slider"
         )
     
-    filtered_df = df[
-        (df['Manufacturer'].isin(selected_manufacturers)) &
-        (df['Product Line'].isin(selected_products)) &
-        (df['Color'].isin(selected_colors)) &
-        (df['Zip Code'].astype(int) >= zip_range[0]) &
-        (df['Zip Code'].astype(int) <= zip_range[1])
-    ]
-    
-    if city_search:
-        filtered_df = filtered_df[
-            filtered_df['City'].str.contains(city_search, case=False, na=False)
+    with timed("jobs_filter"):
+        filtered_df = df[
+            (df['Manufacturer'].isin(selected_manufacturers)) &
+            (df['Product Line'].isin(selected_products)) &
+            (df['Color'].isin(selected_colors)) &
+            (df['Zip Code'].astype(int) >= zip_range[0]) &
+            (df['Zip Code'].astype(int) <= zip_range[1])
         ]
     
+        if city_search:
+            filtered_df = filtered_df[
+                filtered_df['City'].str.contains(city_search, case=False, na=False)
+            ]
+    
     with col2:
         st.subheader(f"Results ({len(filtered_df)} jobs)")
         
         if len(filtered_df) == 0:
             st.info("No jobs match your filters. Try adjusting your search.")
         else:
+            tally("cards", len(filtered_df))
             cols = st.columns(2)
             for idx, (_, row) in enumerate(filtered_df.iterrows()):
                 col = cols[idx % 2]
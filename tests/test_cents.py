@@ -0,0 +1,86 @@
+"""The integer-cents kernel against exact Fraction arithmetic, and the batch
+and scenario paths against the scalar one."""
+import math
+import random
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from pricing.batch import GPM_STEPS, gpm_curve, price_ladder, scenario_matrix
+from pricing.core import (
+    gp, fin_price, price_rows, full_roof_cost, FIN_BASE, LARGE_GPMS, SMALL_GPMS,
+    PRODUCT_CODE, TIER_CODE, PITCH_BUCKET,
+)
+
+MARGINS = [m / 100 for m in range(1, 100)]
+
+def exact_gp(cost, m):
+    """cost / (1 - m) rounded up to a whole dollar, in exact arithmetic."""
+    return math.ceil(Fraction(str(cost)) / (1 - Fraction(str(m))))
+
+def costs(n=3000, seed=7):
+    rng = random.Random(seed)
+    return [rng.randint(1, 200_000) for _ in range(n)] + [rng.randint(100, 20_000_000) / 100 for _ in range(n)]
+
+def test_gp_is_exact():
+    rng = random.Random(1)
+    for cost in costs():
+        m = rng.choice(MARGINS)
+        assert gp(cost, m) == exact_gp(cost, m), (cost, m)
+
+def test_gp_never_above_float_ceil():
+    rng = random.Random(2)
+    for cost in costs():
+        m = rng.choice(MARGINS)
+        assert gp(cost, m) <= math.ceil(cost / (1 - m))
+
+def test_float_artifact_fixed():
+    # 17 / 0.68 is 25.000000000000004 in floats
+    assert math.ceil(17 / (1 - 0.32)) == 26
+    assert gp(17, 0.32) == 25
+
+def test_fin_price_is_exact():
+    for price in range(1, 20_000):
+        assert fin_price(price) == math.ceil(Fraction(price) * Fraction(107, 100))
+
+@pytest.mark.parametrize("gpm_list", [LARGE_GPMS, SMALL_GPMS])
+def test_price_rows_exact(gpm_list):
+    for cost in costs(500):
+        rows = price_rows(cost, gpm_list, custom_gpm=0.27)
+        for (m, _, _), (_, _, p, _) in zip(gpm_list, rows):
+            if m in FIN_BASE:
+                # financing is the whole-dollar base price x 1.07, exact to the cent
+                assert Fraction(str(p)) == exact_gp(cost, FIN_BASE[m]) * Fraction(107, 100)
+            else:
+                assert p == exact_gp(cost, m)
+        assert rows[-2][2] == exact_gp(cost, 0.27)
+        assert Fraction(str(rows[-1][2])) == exact_gp(cost, 0.27) * Fraction(107, 100)
+
+@pytest.mark.parametrize("gpm_list", [LARGE_GPMS, SMALL_GPMS])
+def test_price_ladder_matches_price_rows(gpm_list):
+    cs = costs(500)
+    ladder = price_ladder(cs, gpm_list, custom_gpm=0.27)
+    for cost, got in zip(cs, ladder.tolist()):
+        assert got == [p for _, _, p, _ in price_rows(cost, gpm_list, custom_gpm=0.27)]
+
+def test_gpm_curve_matches_gp():
+    cs = costs(200)
+    price, fin = gpm_curve(cs)
+    for cost, prices, fins in zip(cs, price.tolist(), fin.tolist()):
+        assert prices == [gp(cost, m) for m in GPM_STEPS.tolist()]
+        assert fins == [price_rows(cost, [], m)[-1][2] for m in GPM_STEPS.tolist()]
+
+@pytest.mark.parametrize("std_tsq, low_tsq, low_lc, low_shingled, addons", [
+    (20, 0, 0, False, 0), (34, 3, 1125, False, 300), (41, 2, 0, True, 1310), (97, 0, 0, False, 500),
+])
+def test_scenario_matrix_matches_full_roof_cost(std_tsq, low_tsq, low_lc, low_shingled, addons):
+    cost, prices = scenario_matrix(std_tsq, low_tsq, low_lc, low_shingled, addons)
+    for product, i in PRODUCT_CODE.items():
+        for tier, j in TIER_CODE[product].items():
+            for pitch in (4, 8, 11):
+                c = full_roof_cost(std_tsq, pitch, product, tier, low_tsq, low_lc, low_shingled, addons)
+                b = PITCH_BUCKET[pitch]
+                assert cost[i, j, b] == c
+                assert prices[i, j, b].tolist() == [p for _, _, p, _ in price_rows(c, LARGE_GPMS)]
+    assert np.isnan(cost).sum() == np.isnan(prices[..., 0]).sum()
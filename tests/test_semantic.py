@@ -0,0 +1,36 @@
+"""Meaning-mode handbook search on the questions its request was written for."""
+import os
+
+import pytest
+
+from handbook import HandbookIndex
+
+HANDBOOK = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "handbook_chunks.json")
+PAY_CHART = 16
+
+@pytest.fixture(scope="module", params=["built", "artifact"])
+def index(request, tmp_path_factory):
+    if request.param == "built":
+        return HandbookIndex.from_file(HANDBOOK)
+    root = str(tmp_path_factory.mktemp("handbook_index"))
+    HandbookIndex.from_file(HANDBOOK, index_dir=root)
+    return HandbookIndex.from_file(HANDBOOK, index_dir=root)  # memory-mapped from the artifact
+
+def pages(index, query, mode="semantic", top_k=5):
+    return [c["page"] for c in index.search(query, top_k, mode)]
+
+@pytest.mark.parametrize("query", [
+    "how much do I get paid on a job",
+    "How much do I get paid on a job?",
+    "what do I get paid per job",
+])
+def test_paraphrase_finds_pay_chart(index, query):
+    assert PAY_CHART in pages(index, query)
+
+@pytest.mark.parametrize("mode", ["bm25", "semantic", "keyword"])
+def test_pay_chart_by_name(index, mode):
+    assert pages(index, "pay chart", mode)[0] == PAY_CHART
+
+def test_unknown_words_fall_back(index):
+    # nothing LSA knows: semantic answers like bm25, which answers with the first chunks
+    assert pages(index, "xyzzy plugh") == pages(index, "xyzzy plugh", "bm25") == [c["page"] for c in index.chunks[:5]]